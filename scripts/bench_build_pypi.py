@@ -0,0 +1,416 @@
+"""PyPI 索引构建性能基准测试
+
+使用合成的 wheel 文件列表分别测试 build_pypi.py 中分组, 渲染, 写入, 完整构建和增量构建阶段的耗时,
+吞吐量和峰值内存, 并与基准结果对比, 性能下降超过允许范围或缺少基准结果时以非零状态码退出
+
+- grouping: 按包名分组文件列表
+- rendering: 渲染全部 HTML 和 JSON 页面
+- writing: 将预先渲染的页面写入新的输出目录
+- building: 在新的输出目录中运行完整的 build_pypi_indexes (两个输出, 裁剪索引和完整索引)
+- incremental: 在已构建的输出目录中以相同的输入再次运行 build_pypi_indexes, 输入未变化的包跳过裁剪和渲染
+
+耗时和峰值内存分开测量, 耗时取多次运行的最小值, 并按固定参考任务的耗时换算不同机器之间的速度差异
+
+用法:
+- 生成基准结果: python scripts/bench_build_pypi.py --update-baseline
+- 与基准结果对比: python scripts/bench_build_pypi.py
+"""
+import io
+import os
+import sys
+import json
+import time
+import contextlib
+import random
+import argparse
+import hashlib
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from build_pypi import (  # noqa: E402
+    WheelFileMetadata,
+    group_files_by_package,
+    generate_package_index_html,
+    generate_package_detail_html,
+    generate_package_index_json,
+    generate_package_detail_json,
+    build_pypi_indexes,
+    write_page_if_changed,
+)
+
+
+DEFAULT_BASELINE_PATH = Path(__file__).with_name("bench_build_pypi_baseline.json")
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+# 耗时过短的阶段受计时误差影响较大, 对比时额外允许的耗时
+SECONDS_SLACK = 0.02
+
+# 包名及其权重, 少数大包 (如 flash_attn) 占据大部分 wheel
+PACKAGE_WEIGHTS = {
+    "flash_attn": 30,
+    "torch": 12,
+    "xformers": 10,
+    "triton": 8,
+    "triton_windows": 6,
+    "sageattention": 8,
+    "spargeattn": 4,
+    "onnxruntime_gpu": 4,
+    "insightface": 3,
+    "bitsandbytes": 3,
+    "nunchaku": 3,
+    "llama_cpp_python": 3,
+    "pycocotools": 2,
+    "dlib": 2,
+    "basicsr": 1,
+    "pyreadline3": 1,
+}
+PYTHON_TAGS = ["cp39", "cp310", "cp311", "cp312", "cp313"]
+PLATFORM_TAGS = [
+    "win_amd64",
+    "linux_x86_64",
+    "manylinux_2_17_x86_64.manylinux2014_x86_64",
+    "manylinux_2_28_x86_64",
+    "macosx_11_0_arm64",
+]
+TORCH_VERSIONS = ["2.4.0", "2.5.1", "2.6.0", "2.7.1", "2.8.0"]
+CUDA_VERSIONS = ["cu118", "cu121", "cu124", "cu126", "cu128"]
+
+
+class StageResult(TypedDict):
+    seconds: float
+    wheels_per_second: float
+    peak_memory_mb: float
+
+
+class BenchmarkReport(TypedDict):
+    # 参考任务的耗时, 用于换算不同机器之间的速度差异
+    calibration_seconds: float
+    results: dict[str, dict[str, StageResult]]
+
+
+def generate_wheel_listing(
+    count: int,
+    seed: int = 0,
+) -> tuple[list[tuple[str, str]], dict[str, WheelFileMetadata]]:
+    """生成合成的 wheel 文件列表
+
+    :param count`(int)`: wheel 数量
+    :param seed`(int)`: 随机数种子
+    :return `tuple[list[tuple[str, str]], dict[str, WheelFileMetadata]]`: 文件列表 `[<路径>, <链接>]` 和文件元数据
+    """
+    rng = random.Random(seed)
+    names = list(PACKAGE_WEIGHTS)
+    weights = list(PACKAGE_WEIGHTS.values())
+    file_list: list[tuple[str, str]] = []
+    file_metadata: dict[str, WheelFileMetadata] = {}
+    seen: set[str] = set()
+
+    while len(file_list) < count:
+        name = rng.choices(names, weights)[0]
+        version = f"{rng.randint(0, 3)}.{rng.randint(0, 12)}.{rng.randint(0, 30)}"
+        if rng.random() < 0.6:
+            version += f"+{rng.choice(CUDA_VERSIONS)}torch{rng.choice(TORCH_VERSIONS)}"
+        python_tag = rng.choice(PYTHON_TAGS)
+        platform_tag = rng.choice(PLATFORM_TAGS)
+        filename = f"{name}-{version}-{python_tag}-{python_tag}-{platform_tag}.whl"
+        if filename in seen:
+            continue
+
+        seen.add(filename)
+        path = f"{name}/{filename}"
+        file_list.append((path, f"https://huggingface.co/licyk/wheel/resolve/main/{path}"))
+        file_metadata[filename] = {
+            "size": rng.randint(100_000, 800_000_000),
+            "upload_time": "2025-01-01T00:00:00.000000Z",
+            "sha256": hashlib.sha256(filename.encode("utf-8")).hexdigest(),
+        }
+
+    return file_list, file_metadata
+
+
+def calibrate(
+    repeat: int = 5,
+) -> float:
+    """测量固定参考任务的耗时, 用于换算不同机器之间的速度差异
+
+    :param repeat`(int)`: 运行次数, 取最小值
+    :return `float`: 参考任务耗时 (秒)
+    """
+    rng = random.Random(0)
+    data = [f"{rng.getrandbits(64):x}-{i}.whl" for i in range(50000)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        groups: dict[str, list[str]] = {}
+        for item in sorted(data):
+            groups.setdefault(item[:2], []).append(hashlib.sha256(item.encode("utf-8")).hexdigest())
+        json.dumps(groups)
+        best = min(best, time.perf_counter() - start)
+    return round(best, 4)
+
+
+def measure(
+    func: Callable[[], Any],
+    wheel_count: int,
+    repeat: int = DEFAULT_REPEAT,
+) -> tuple[Any, StageResult]:
+    """分别测量函数的耗时和峰值内存
+
+    耗时在未启用 tracemalloc 时测量, 取 repeat 次运行的最小值, 峰值内存在额外的一次运行中测量,
+    函数输出的日志不计入结果
+
+    :param func`(Callable[[], Any])`: 要测量的函数
+    :param wheel_count`(int)`: 函数处理的 wheel 数量
+    :param repeat`(int)`: 测量耗时的运行次数
+    :return `tuple[Any, StageResult]`: 函数返回值和测量结果
+    """
+    result = None
+    seconds = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            result = func()
+            seconds = min(seconds, time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return result, {
+        "seconds": round(seconds, 4),
+        "wheels_per_second": round(wheel_count / seconds, 1) if seconds > 0 else 0.0,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def render_pages(
+    packages: dict[str, list[tuple[str, str]]],
+    file_metadata: dict[str, WheelFileMetadata],
+) -> list[tuple[str, str]]:
+    """渲染全部索引页面
+
+    :param packages`(dict[str, list[tuple[str, str]]])`: 按包名分组的文件列表
+    :param file_metadata`(dict[str, WheelFileMetadata])`: 文件元数据
+    :return `list[tuple[str, str]]`: 页面列表 `[<相对路径>, <内容>]`
+    """
+    pages = [
+        ("index.html", generate_package_index_html(packages)),
+        ("index.json", generate_package_index_json(packages)),
+    ]
+    for package_name, files in packages.items():
+        pages.append(
+            (
+                f"{package_name}/index.html",
+                generate_package_detail_html(package_name, files, file_metadata=file_metadata),
+            )
+        )
+        pages.append(
+            (f"{package_name}/index.json", generate_package_detail_json(package_name, files, file_metadata))
+        )
+    return pages
+
+
+def write_pages(
+    pages: list[tuple[str, str]],
+    output_dir: Path,
+) -> None:
+    """使用 build_pypi.py 的页面写入函数将预先渲染的页面写入空的输出目录
+
+    :param pages`(list[tuple[str, str]])`: 页面列表 `[<相对路径>, <内容>]`
+    :param output_dir`(Path)`: 输出目录, 不存在时创建
+    """
+    new_manifest: dict[str, str] = {}
+    for relative_path, content in pages:
+        write_page_if_changed(output_dir, relative_path, content, {}, new_manifest)
+
+
+def build_indexes(
+    file_list: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+    output_dir: Path,
+) -> None:
+    """使用与 build_pypi.py 相同的方式构建原始链接和镜像链接两个输出, 并按每个平台保留最新版本裁剪索引
+
+    :param file_list`(list[tuple[str, str]])`: 文件列表 `[<路径>, <链接>]`
+    :param file_metadata`(dict[str, WheelFileMetadata])`: 文件元数据
+    :param output_dir`(Path)`: 输出目录
+    """
+    build_pypi_indexes(
+        file_list,
+        [
+            {"output_dir": output_dir / "pypi_hf", "url_prefix": None},
+            {
+                "output_dir": output_dir / "pypi_hf_mirror",
+                "url_prefix": ("https://huggingface.co/", "https://hf-mirror.com/"),
+            },
+        ],
+        file_metadata,
+        keep_versions=1,
+    )
+
+
+def build_indexes_from_scratch(
+    file_list: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+) -> None:
+    """在新的临时目录中完整构建索引
+
+    :param file_list`(list[tuple[str, str]])`: 文件列表 `[<路径>, <链接>]`
+    :param file_metadata`(dict[str, WheelFileMetadata])`: 文件元数据
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        build_indexes(file_list, file_metadata, Path(output_dir))
+
+
+def run_benchmark(
+    sizes: list[int],
+    repeat: int = DEFAULT_REPEAT,
+) -> dict[str, dict[str, StageResult]]:
+    """运行基准测试
+
+    :param sizes`(list[int])`: 要测试的 wheel 数量
+    :param repeat`(int)`: 每个阶段测量耗时的运行次数
+    :return `dict[str, dict[str, StageResult]]`: 测试结果 `{<wheel 数量>: {<阶段>: <结果>}}`
+    """
+    results: dict[str, dict[str, StageResult]] = {}
+    for size in sizes:
+        file_list, file_metadata = generate_wheel_listing(size)
+        packages, grouping = measure(lambda: group_files_by_package(file_list), size, repeat)
+        pages, rendering = measure(lambda: render_pages(packages, file_metadata), size, repeat)
+        with tempfile.TemporaryDirectory() as output_root:
+            # 每次运行写入新的子目录, 目录清理不计入耗时
+            run_dirs = (Path(output_root) / str(index) for index in range(repeat + 2))
+            _, writing = measure(lambda: write_pages(pages, next(run_dirs)), size, repeat)
+        _, building = measure(lambda: build_indexes_from_scratch(file_list, file_metadata), size, repeat)
+        with tempfile.TemporaryDirectory() as output_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_indexes(file_list, file_metadata, Path(output_dir))
+            _, incremental = measure(lambda: build_indexes(file_list, file_metadata, Path(output_dir)), size, repeat)
+
+        results[str(size)] = {
+            "grouping": grouping,
+            "rendering": rendering,
+            "writing": writing,
+            "building": building,
+            "incremental": incremental,
+        }
+        for stage, result in results[str(size)].items():
+            print(
+                f"[{size} wheels] {stage:<11} 耗时: {result['seconds']:.4f} 秒, "
+                f"吞吐量: {result['wheels_per_second']:.1f} wheel/秒, "
+                f"峰值内存: {result['peak_memory_mb']:.2f} MB"
+            )
+
+    return results
+
+
+def compare_with_baseline(
+    report: BenchmarkReport,
+    baseline: BenchmarkReport,
+    tolerance: float,
+) -> list[str]:
+    """与基准结果对比
+
+    耗时按参考任务的耗时比例换算到本机速度后再对比, 峰值内存直接对比
+
+    :param report`(BenchmarkReport)`: 本次测试结果
+    :param baseline`(BenchmarkReport)`: 基准结果
+    :param tolerance`(float)`: 允许的耗时和内存增长倍数
+    :return `list[str]`: 性能下降的项目列表
+    """
+    speed_ratio = report["calibration_seconds"] / baseline["calibration_seconds"]
+    print(f"本机参考任务耗时为基准机器的 {speed_ratio:.2f} 倍")
+
+    regressions: list[str] = []
+    for size, stages in report["results"].items():
+        for stage, result in stages.items():
+            base = baseline["results"].get(size, {}).get(stage)
+            if base is None:
+                continue
+            limits = {
+                "seconds": base["seconds"] * tolerance * speed_ratio + SECONDS_SLACK,
+                "peak_memory_mb": base["peak_memory_mb"] * tolerance,
+            }
+            for key, limit in limits.items():
+                if base[key] > 0 and result[key] > limit:
+                    regressions.append(
+                        f"[{size} wheels] {stage} {key}: {result[key]} > 允许值 {limit:.4f} (基准 {base[key]})"
+                    )
+
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PyPI 索引构建性能基准测试")
+    parser.add_argument(
+        "--sizes",
+        nargs="*",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="要测试的 wheel 数量, 默认为 1000 10000 100000",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE_PATH,
+        help="基准结果 Json 文件路径",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="将本次测试结果保存为基准结果",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="每个阶段测量耗时的运行次数, 取最小值, 默认为 3",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="允许的耗时和内存增长倍数, 默认为 1.5",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    report: BenchmarkReport = {
+        "calibration_seconds": calibrate(),
+        "results": run_benchmark(args.sizes, args.repeat),
+    }
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=4), encoding="utf-8")
+        print(f"保存基准结果到 {args.baseline}")
+        return 0
+
+    if not args.baseline.is_file():
+        print(f"未找到基准结果 {args.baseline}, 无法检查性能下降, 使用 --update-baseline 生成")
+        return 1
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare_with_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print("!" * 60)
+        print("检测到性能下降:")
+        for regression in regressions:
+            print(f"- {regression}")
+        print("!" * 60)
+        return 1
+
+    print("性能与基准结果相比无明显下降")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 import re
 import os
+import sys
 import json
 import html
 from urllib.parse import urljoin
@@ -9,6 +10,10 @@ from typing import TypedDict
 import requests
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from precompress import precompress_files  # noqa: E402
+
 
 @dataclass
 class VersionInfo:
@@ -228,6 +233,7 @@ def main() -> None:
         save_path=root_path / "lora_list.json",
         origin_list=lora_info,
     )
+    precompress_files([root_path / "lora_list.json"])
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
 import os
+import re
+import sys
 import json
 import time
+import datetime
+import hashlib
+import threading
+import urllib.parse
+import urllib.request
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Any,
     Union,
@@ -11,12 +19,19 @@ from typing import (
     ParamSpec,
     TypedDict,
     TypeAlias,
+    NotRequired,
     cast,
 )
 from pathlib import Path
 
 from sd_webui_all_in_one.repo_manager import RepoManager
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hf_repo_tree import iter_repo_tree_parallel, list_repo_files_parallel  # noqa: E402
+from ms_repo_tree import list_modelscope_repo_tree  # noqa: E402
+from precompress import precompress_directory  # noqa: E402
+
 
 T = TypeVar("T")
 P = ParamSpec("P")
@@ -129,19 +144,31 @@ def retryable(
 def get_huggingface_repo_file(
     repo_id: str,
     repo_type: Literal["model", "dataset", "space"],
+    tree_workers: int = 1,
 ) -> list[tuple[str, str]]:
     '''从 HuggingFace 仓库获取文件列表
 
     :param repo_id`(str)`: 仓库 ID
     :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :param tree_workers`(int)`: 仓库内按顶层目录并行获取文件树的线程数, 小于等于 1 时不并行
     :return `list[tuple[str, str]]`: 仓库文件列表 `[<路径>, <链接>]`
     '''
     repo_manager = RepoManager()
-    repo_files = repo_manager.get_repo_file(
-        api_type="huggingface",
-        repo_id=repo_id,
-        repo_type=repo_type,
-    )
+    if tree_workers > 1:
+        from huggingface_hub import HfApi
+
+        repo_files = list_repo_files_parallel(
+            HfApi(),
+            repo_id=repo_id,
+            repo_type=repo_type,
+            max_workers=tree_workers,
+        )
+    else:
+        repo_files = repo_manager.get_repo_file(
+            api_type="huggingface",
+            repo_id=repo_id,
+            repo_type=repo_type,
+        )
     return [
         (
             file_path,
@@ -193,6 +220,148 @@ def get_modelscope_repo_file(
     ]
 
 
+class RepoFileMetadata(TypedDict, total=False):
+    """仓库文件列表中附带的文件元数据"""
+
+    size: int
+    sha256: str
+    # 只有 HuggingFace 仓库的文件附带 Git blob ID, 用于检测没有 sha256 的非 LFS 文件的修改
+    blob_id: str
+    # 只有 ModelScope 仓库的文件附带最后修改时间
+    last_modified: str
+
+
+def format_last_modified(value: datetime.datetime | str | None) -> str | None:
+    """将最后修改时间转换为 ISO 8601 UTC 时间格式
+
+    :param value`(datetime.datetime | str | None)`: 最后修改时间
+    :return `str | None`: ISO 8601 格式的时间, 无法解析时返回 None
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@retryable(
+    times=3,
+    delay=1.0,
+    describe="获取 HuggingFace 仓库文件列表和元数据",
+    catch_exceptions=Exception,
+    raise_exception=RuntimeError,
+)
+def get_huggingface_repo_file_with_metadata(
+    repo_id: str,
+    repo_type: Literal["model", "dataset", "space"],
+    tree_workers: int = 1,
+) -> tuple[list[tuple[str, str]], dict[str, RepoFileMetadata]]:
+    '''通过 HuggingFace 仓库树接口获取文件列表, 同时获取文件大小, Git blob ID 和 LFS sha256
+
+    不使用 `expand` 参数, 使仓库树接口保持每页 1000 个条目, `expand` 会将每页条目数降为 50,
+    因此 HuggingFace 仓库的文件不附带最后修改时间
+
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :param tree_workers`(int)`: 仓库内按顶层目录并行获取文件树的线程数, 小于等于 1 时不并行
+    :return `tuple[list[tuple[str, str]], dict[str, RepoFileMetadata]]`: 仓库文件列表 `[<路径>, <链接>]` 和 `{<路径>: <元数据>}`
+    '''
+    from huggingface_hub import HfApi
+    from huggingface_hub.hf_api import RepoFile
+
+    repo_manager = RepoManager()
+    files: list[tuple[str, str]] = []
+    file_metadata: dict[str, RepoFileMetadata] = {}
+    for item in iter_repo_tree_parallel(
+        HfApi(),
+        repo_id=repo_id,
+        repo_type=repo_type,
+        max_workers=tree_workers,
+    ):
+        if not isinstance(item, RepoFile):
+            continue
+
+        files.append(
+            (
+                item.path,
+                repo_manager.get_repo_file_download_url(
+                    api_type="huggingface",
+                    repo_id=repo_id,
+                    file_path=item.path,
+                    repo_type=repo_type,
+                ),
+            )
+        )
+        metadata: RepoFileMetadata = {"size": item.size}
+        if item.blob_id:
+            metadata["blob_id"] = item.blob_id
+        if item.lfs is not None:
+            metadata["sha256"] = item.lfs.sha256
+        file_metadata[item.path] = metadata
+
+    # 并行获取时各目录的完成顺序不固定
+    files.sort()
+    return files, file_metadata
+
+
+@retryable(
+    times=3,
+    delay=1.0,
+    describe="获取 ModelScope 仓库文件列表和元数据",
+    catch_exceptions=Exception,
+    raise_exception=RuntimeError,
+)
+def get_modelscope_repo_file_with_metadata(
+    repo_id: str,
+    repo_type: Literal["model", "dataset", "space"],
+) -> tuple[list[tuple[str, str]], dict[str, RepoFileMetadata]]:
+    '''通过 ModelScope 文件列表接口获取文件列表, 同时获取文件大小, sha256 和提交时间
+
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :return `tuple[list[tuple[str, str]], dict[str, RepoFileMetadata]]`: 仓库文件列表 `[<路径>, <链接>]` 和 `{<路径>: <元数据>}`
+    '''
+    repo_manager = RepoManager()
+    files: list[tuple[str, str]] = []
+    file_metadata: dict[str, RepoFileMetadata] = {}
+    for item in list_modelscope_repo_tree(repo_id=repo_id, repo_type=repo_type):
+        if item.get("Type") == "tree" or not item.get("Path"):
+            continue
+
+        file_path = item["Path"]
+        files.append(
+            (
+                file_path,
+                repo_manager.get_repo_file_download_url(
+                    api_type="modelscope",
+                    repo_id=repo_id,
+                    file_path=file_path,
+                    repo_type=repo_type,
+                ),
+            )
+        )
+        metadata: RepoFileMetadata = {}
+        if item.get("Size") is not None:
+            metadata["size"] = int(item["Size"])
+        if item.get("Sha256"):
+            metadata["sha256"] = item["Sha256"]
+        committed_date = item.get("CommittedDate")
+        if isinstance(committed_date, (int, float)):
+            committed_date = datetime.datetime.fromtimestamp(committed_date, tz=datetime.timezone.utc)
+        last_modified = format_last_modified(committed_date)
+        if last_modified is not None:
+            metadata["last_modified"] = last_modified
+        file_metadata[file_path] = metadata
+
+    return files, file_metadata
+
+
 def write_content_to_file(content: list, path: Union[str, Path]) -> None:
     '''将列表写入文件中
 
@@ -213,11 +382,12 @@ def write_content_to_file(content: list, path: Union[str, Path]) -> None:
             f.write(item + "\n")
 
 
-def save_list_to_json(save_path: Path | str, data: Any) -> bool:
+def save_list_to_json(save_path: Path | str, data: Any, compact: bool = False) -> bool:
     """保存列表到 Json 文件中
 
     :param save_path`(Path,str)`: 保存 Json 文件的路径
     :param data`(Any)`: 要保存的列表
+    :param compact`(bool)`: 是否不使用缩进和空格输出
     :return `bool`: 当文件保存成功时返回`True`
     """
     dir_path = os.path.dirname(save_path)
@@ -231,8 +401,8 @@ def save_list_to_json(save_path: Path | str, data: Any) -> bool:
                 data,
                 f,
                 ensure_ascii=False,
-                indent=4,
-                separators=(',', ': ')
+                indent=None if compact else 4,
+                separators=(',', ':') if compact else (',', ': ')
             )
         print(f"保存 Json 文件到 {save_path}")
         return True
@@ -247,37 +417,796 @@ class RepoMetadata(TypedDict):
     repo_id: str
     repo_type: Literal["model", "dataset", "space"]
     files: list[RepoFileType]
+    file_metadata: NotRequired[dict[str, RepoFileMetadata]]
+    sha: NotRequired[str]
+    error: NotRequired[str]
+
+
+
+def get_hf_repo_sha(
+    repo_id: str,
+    repo_type: Literal["model", "dataset", "space"],
+) -> str | None:
+    """获取 HuggingFace 仓库最新提交的 sha, 获取失败时返回 None
+
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :return `str | None`: 最新提交的 sha
+    """
+    from huggingface_hub import HfApi
+
+    try:
+        return HfApi().repo_info(repo_id=repo_id, repo_type=repo_type).sha
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"获取 HuggingFace 仓库 {repo_id} 的最新提交失败: {e}")
+        return None
+
+
+def get_ms_repo_sha(
+    repo_id: str,
+    repo_type: Literal["model", "dataset", "space"],
+) -> str | None:
+    """获取 ModelScope 仓库最新提交的 sha, 获取失败时返回 None
+
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :return `str | None`: 最新提交的 sha
+    """
+    from modelscope import HubApi
+
+    try:
+        commits = HubApi().list_repo_commits(
+            repo_id=repo_id,
+            repo_type=repo_type,
+            page_number=1,
+            page_size=1,
+        )
+        return commits.commits[0].id if commits.commits else None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"获取 ModelScope 仓库 {repo_id} 的最新提交失败: {e}")
+        return None
 
 
+def reuse_previous_repo_data(
+    previous: RepoMetadata | None,
+    sha: str | None,
+    with_metadata: bool = False,
+) -> RepoMetadata | None:
+    """仓库最新提交与上一次的记录一致时复用上一次的文件列表
+
+    :param previous`(RepoMetadata | None)`: 上一次的仓库文件列表
+    :param sha`(str | None)`: 仓库当前最新提交的 sha
+    :param with_metadata`(bool)`: 是否需要文件元数据, 为`True`时上一次的文件列表缺少元数据则不复用
+    :return `RepoMetadata | None`: 可复用时返回上一次的文件列表, 否则返回 None
+    """
+    if sha is None or previous is None or "error" in previous or previous.get("sha") != sha:
+        return None
+    if with_metadata != ("file_metadata" in previous):
+        return None
+
+    print(f"仓库 {previous['repo_id']} 未发生变化 (sha: {sha}), 复用上一次的文件列表")
+    return previous
+
 
 def build_hf_repo_data(
     repo_id: str,
     repo_type: Literal["model", "dataset", "space"],
+    previous: RepoMetadata | None = None,
+    with_metadata: bool = False,
+    tree_workers: int = 1,
 ) -> RepoMetadata:
-    hf_files = get_huggingface_repo_file(
-        repo_id=repo_id,
-        repo_type=repo_type,
-    )
-    return {
+    sha = get_hf_repo_sha(repo_id=repo_id, repo_type=repo_type)
+    reused = reuse_previous_repo_data(previous, sha, with_metadata)
+    if reused is not None:
+        return reused
+
+    if with_metadata:
+        hf_files, file_metadata = get_huggingface_repo_file_with_metadata(
+            repo_id=repo_id,
+            repo_type=repo_type,
+            tree_workers=tree_workers,
+        )
+    else:
+        hf_files = get_huggingface_repo_file(
+            repo_id=repo_id,
+            repo_type=repo_type,
+            tree_workers=tree_workers,
+        )
+    data: RepoMetadata = {
         "repo_id": repo_id,
         "repo_type": repo_type,
         "files": hf_files,
     }
+    if with_metadata:
+        data["file_metadata"] = file_metadata
+    if sha is not None:
+        data["sha"] = sha
+    return data
 
 
 def build_ms_repo_data(
     repo_id: str,
     repo_type: Literal["model", "dataset", "space"],
+    previous: RepoMetadata | None = None,
+    with_metadata: bool = False,
 ) -> RepoMetadata:
-    ms_files = get_modelscope_repo_file(
-        repo_id=repo_id,
-        repo_type=repo_type,
-    )
-    return {
+    sha = get_ms_repo_sha(repo_id=repo_id, repo_type=repo_type)
+    reused = reuse_previous_repo_data(previous, sha, with_metadata)
+    if reused is not None:
+        return reused
+
+    if with_metadata:
+        ms_files, file_metadata = get_modelscope_repo_file_with_metadata(
+            repo_id=repo_id,
+            repo_type=repo_type,
+        )
+    else:
+        ms_files = get_modelscope_repo_file(
+            repo_id=repo_id,
+            repo_type=repo_type,
+        )
+    data: RepoMetadata = {
         "repo_id": repo_id,
         "repo_type": repo_type,
         "files": ms_files,
     }
+    if with_metadata:
+        data["file_metadata"] = file_metadata
+    if sha is not None:
+        data["sha"] = sha
+    return data
+
+
+PreviousRepoData: TypeAlias = dict[tuple[str, str], RepoMetadata]
+
+
+SHARDED_FORMAT = "sharded"
+SHARD_MANIFEST_FILENAME = "manifest.json"
+REPO_LIST_PLATFORMS = ("huggingface", "modelscope")
+
+
+def read_json_source(source: str) -> Any:
+    """从本地路径或链接读取 Json 数据
+
+    :param source`(str)`: 本地路径或链接
+    :return `Any`: Json 数据
+    """
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_previous_repo_data(
+    source: str | None,
+) -> dict[str, PreviousRepoData]:
+    """加载上一次生成的仓库文件列表
+
+    支持完整的 repo_file_list.json, 紧凑格式的 repo_file_list.compact.json 和分片格式的清单文件 (manifest.json),
+    分片格式时根据清单中的路径逐个加载仓库分片
+
+    :param source`(str | None)`: 上一次生成的仓库列表或分片清单文件的本地路径或链接
+    :return `dict[str, PreviousRepoData]`: 按平台和 `(仓库 ID, 仓库类型)` 索引的仓库文件列表
+    """
+    if not source:
+        return {}
+
+    try:
+        data = read_json_source(source)
+        if data.get("format") == COMPACT_FORMAT:
+            data = decode_compact_repo_list(data)
+        elif data.get("format") == SHARDED_FORMAT:
+            base = source.rsplit("/", 1)[0] if "/" in source else "."
+            data = {
+                platform: [
+                    read_json_source(f"{base}/{entry['path']}")
+                    for entry in data.get(platform, [])
+                ]
+                for platform in REPO_LIST_PLATFORMS
+            }
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"加载上一次的仓库列表 {source} 失败, 将重新获取全部仓库: {e}")
+        return {}
+
+    previous: dict[str, PreviousRepoData] = {}
+    for platform, repos in data.items():
+        if not isinstance(repos, list):
+            continue
+        previous[platform] = {
+            (repo["repo_id"], repo["repo_type"]): repo
+            for repo in repos
+            if isinstance(repo, dict) and "repo_id" in repo and "repo_type" in repo
+        }
+    print(f"已加载上一次的仓库列表: {source}")
+    return previous
+
+
+class RepoShardEntry(TypedDict):
+    repo_id: str
+    repo_type: Literal["model", "dataset", "space"]
+    path: str
+    sha256: str
+    file_count: int
+    sha: NotRequired[str]
+    error: NotRequired[str]
+
+
+class ShardedRepoListWriter:
+    """按仓库分片写入仓库文件列表
+
+    每个仓库获取完成后立即写入 `<平台>/<所有者>/<仓库名>.json`, 非 model 类型的仓库文件名追加
+    `@<仓库类型>` 避免同名冲突, 全部仓库完成后写入包含文件数量和分片哈希的清单文件
+    """
+
+    def __init__(self, root_dir: Path) -> None:
+        """
+        :param root_dir`(Path)`: 分片输出目录
+        """
+        self.root_dir = root_dir
+        self.entries: dict[tuple[str, str, str], RepoShardEntry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_shard_path(
+        platform: str,
+        repo_id: str,
+        repo_type: Literal["model", "dataset", "space"],
+    ) -> str:
+        """获取仓库分片的相对路径
+
+        :param platform`(str)`: 平台名称
+        :param repo_id`(str)`: 仓库 ID
+        :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+        :return `str`: 分片相对路径
+        """
+        suffix = "" if repo_type == "model" else f"@{repo_type}"
+        return f"{platform}/{repo_id}{suffix}.json"
+
+    def write_repo(
+        self,
+        platform: str,
+        data: RepoMetadata,
+    ) -> None:
+        """写入单个仓库的分片
+
+        :param platform`(str)`: 平台名称
+        :param data`(RepoMetadata)`: 仓库文件列表
+        """
+        relative_path = self.get_shard_path(platform, data["repo_id"], data["repo_type"])
+        content = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        shard_file = self.root_dir / relative_path
+        shard_file.parent.mkdir(parents=True, exist_ok=True)
+        shard_file.write_bytes(content)
+
+        entry: RepoShardEntry = {
+            "repo_id": data["repo_id"],
+            "repo_type": data["repo_type"],
+            "path": relative_path,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "file_count": len(data["files"]),
+        }
+        if "sha" in data:
+            entry["sha"] = data["sha"]
+        if "error" in data:
+            entry["error"] = data["error"]
+        with self._lock:
+            self.entries[(platform, data["repo_id"], data["repo_type"])] = entry
+
+    def write_manifest(
+        self,
+        repo_data: dict[str, list[RepoMetadata]],
+    ) -> Path:
+        """按仓库列表的顺序写入清单文件, 并删除已不在清单中的旧分片
+
+        :param repo_data`(dict[str, list[RepoMetadata]])`: 按平台分组的仓库列表, 仅用于确定清单顺序
+        :return `Path`: 清单文件路径
+        """
+        manifest: dict[str, Any] = {
+            "format": SHARDED_FORMAT,
+            "version": 1,
+            "total_repos": 0,
+            "total_files": 0,
+        }
+        for platform in REPO_LIST_PLATFORMS:
+            entries = [
+                self.entries[(platform, repo["repo_id"], repo["repo_type"])]
+                for repo in repo_data.get(platform, [])
+                if (platform, repo["repo_id"], repo["repo_type"]) in self.entries
+            ]
+            manifest[platform] = entries
+            manifest["total_repos"] += len(entries)
+            manifest["total_files"] += sum(entry["file_count"] for entry in entries)
+
+        shard_paths = {entry["path"] for platform in REPO_LIST_PLATFORMS for entry in manifest[platform]}
+        for path in sorted(self.root_dir.rglob("*.json")):
+            relative_path = path.relative_to(self.root_dir).as_posix()
+            if relative_path != SHARD_MANIFEST_FILENAME and relative_path not in shard_paths:
+                print(f"删除过期的仓库分片: {relative_path}")
+                path.unlink()
+                if path.parent != self.root_dir and not any(path.parent.iterdir()):
+                    path.parent.rmdir()
+
+        manifest_file = self.root_dir / SHARD_MANIFEST_FILENAME
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        manifest_file.write_text(json.dumps(manifest, ensure_ascii=False, indent=4), encoding="utf-8")
+        print(
+            f"仓库分片清单已保存到: {manifest_file}, "
+            f"仓库数量: {manifest['total_repos']}, 文件数量: {manifest['total_files']}"
+        )
+        return manifest_file
+
+
+COMPACT_FORMAT = "compact"
+URL_TEMPLATE_PLACEHOLDER = "{path}"
+# 文件路径在下载链接中的编码方式
+PATH_ENCODERS: dict[str, Callable[[str], str]] = {
+    "raw": lambda path: path,
+    "quote": lambda path: urllib.parse.quote(path, safe="/"),
+    "quote_all": lambda path: urllib.parse.quote(path, safe=""),
+}
+
+
+class CompactRepoMetadata(TypedDict):
+    repo_id: str
+    repo_type: Literal["model", "dataset", "space"]
+    url_template: str
+    path_encoding: str
+    files: list[str] | list[tuple[int, str]]
+    file_metadata: NotRequired[list[RepoFileMetadata]]
+    front_coded: NotRequired[bool]
+    url_overrides: NotRequired[dict[str, str]]
+    sha: NotRequired[str]
+    error: NotRequired[str]
+
+
+def front_code_paths(paths: list[str]) -> list[tuple[int, str]]:
+    """使用前缀压缩编码路径列表, 每个路径记录为与上一个路径的公共前缀长度和剩余部分
+
+    :param paths`(list[str])`: 路径列表
+    :return `list[tuple[int, str]]`: 编码后的路径列表 `[<公共前缀长度>, <剩余部分>]`
+    """
+    result: list[tuple[int, str]] = []
+    previous = ""
+    for path in paths:
+        common = len(os.path.commonprefix([previous, path]))
+        result.append((common, path[common:]))
+        previous = path
+    return result
+
+
+def expand_front_coded_paths(entries: list[tuple[int, str]]) -> list[str]:
+    """还原前缀压缩编码的路径列表
+
+    :param entries`(list[tuple[int, str]])`: 编码后的路径列表 `[<公共前缀长度>, <剩余部分>]`
+    :return `list[str]`: 路径列表
+    """
+    paths: list[str] = []
+    previous = ""
+    for common, rest in entries:
+        previous = previous[:common] + rest
+        paths.append(previous)
+    return paths
+
+
+def infer_url_template(files: list[RepoFileType]) -> tuple[str, str]:
+    """从文件列表中推断下载链接模板和路径编码方式
+
+    以第一个文件的链接生成候选模板, 选择能匹配最多文件的一个
+
+    :param files`(list[RepoFileType])`: 仓库文件列表 `[<路径>, <链接>]`
+    :return `tuple[str, str]`: 链接模板和路径编码方式, 无法推断时模板为空字符串
+    """
+    if not files:
+        return "", "raw"
+
+    first_path, first_url = files[0]
+    candidates: list[tuple[str, str, str]] = []
+    for encoding, encoder in PATH_ENCODERS.items():
+        encoded = encoder(first_path)
+        index = first_url.rfind(encoded)
+        if encoded and index != -1:
+            candidates.append((first_url[:index], first_url[index + len(encoded):], encoding))
+
+    best_template, best_encoding, best_count = "", "raw", 0
+    for prefix, suffix, encoding in candidates:
+        encoder = PATH_ENCODERS[encoding]
+        count = sum(1 for path, url in files if url == f"{prefix}{encoder(path)}{suffix}")
+        if count > best_count:
+            best_template = f"{prefix}{URL_TEMPLATE_PLACEHOLDER}{suffix}"
+            best_encoding, best_count = encoding, count
+
+    return best_template, best_encoding
+
+
+def build_repo_file_url(
+    url_template: str,
+    path_encoding: str,
+    path: str,
+) -> str:
+    """根据链接模板生成文件下载链接
+
+    :param url_template`(str)`: 链接模板
+    :param path_encoding`(str)`: 路径编码方式
+    :param path`(str)`: 文件路径
+    :return `str`: 文件下载链接
+    """
+    return url_template.replace(URL_TEMPLATE_PLACEHOLDER, PATH_ENCODERS[path_encoding](path), 1)
+
+
+def encode_compact_repo_data(
+    data: RepoMetadata,
+    front_coding: bool = False,
+) -> CompactRepoMetadata:
+    """将仓库文件列表编码为紧凑格式
+
+    每个仓库只保存一个链接模板, 文件列表只保存路径, 无法通过模板还原的链接保存在 `url_overrides` 中
+
+    :param data`(RepoMetadata)`: 仓库文件列表
+    :param front_coding`(bool)`: 是否使用前缀压缩编码路径列表
+    :return `CompactRepoMetadata`: 紧凑格式的仓库文件列表
+    """
+    url_template, path_encoding = infer_url_template(data["files"])
+    paths = [path for path, _ in data["files"]]
+    url_overrides = {
+        str(index): url
+        for index, (path, url) in enumerate(data["files"])
+        if not url_template or build_repo_file_url(url_template, path_encoding, path) != url
+    }
+
+    compact: CompactRepoMetadata = {
+        "repo_id": data["repo_id"],
+        "repo_type": data["repo_type"],
+        "url_template": url_template,
+        "path_encoding": path_encoding,
+        "files": front_code_paths(paths) if front_coding else paths,
+    }
+    if front_coding:
+        compact["front_coded"] = True
+    if url_overrides:
+        compact["url_overrides"] = url_overrides
+    if "file_metadata" in data:
+        # 与文件列表按顺序对应, 避免重复保存路径
+        compact["file_metadata"] = [data["file_metadata"].get(path, {}) for path in paths]
+    if "sha" in data:
+        compact["sha"] = data["sha"]
+    if "error" in data:
+        compact["error"] = data["error"]
+    return compact
+
+
+def decode_compact_repo_data(compact: CompactRepoMetadata) -> RepoMetadata:
+    """将紧凑格式的仓库文件列表还原为 `RepoMetadata`
+
+    :param compact`(CompactRepoMetadata)`: 紧凑格式的仓库文件列表
+    :return `RepoMetadata`: 仓库文件列表
+    """
+    if compact.get("front_coded"):
+        paths = expand_front_coded_paths(cast(list[tuple[int, str]], compact["files"]))
+    else:
+        paths = cast(list[str], compact["files"])
+
+    url_overrides = compact.get("url_overrides", {})
+    data: RepoMetadata = {
+        "repo_id": compact["repo_id"],
+        "repo_type": compact["repo_type"],
+        "files": [
+            (
+                path,
+                url_overrides.get(str(index))
+                or build_repo_file_url(compact["url_template"], compact["path_encoding"], path),
+            )
+            for index, path in enumerate(paths)
+        ],
+    }
+    if "file_metadata" in compact:
+        data["file_metadata"] = dict(zip(paths, compact["file_metadata"]))
+    if "sha" in compact:
+        data["sha"] = compact["sha"]
+    if "error" in compact:
+        data["error"] = compact["error"]
+    return data
+
+
+def encode_compact_repo_list(
+    repo_data: dict[str, list[RepoMetadata]],
+    front_coding: bool = False,
+) -> dict[str, Any]:
+    """将全部仓库文件列表编码为紧凑格式
+
+    :param repo_data`(dict[str, list[RepoMetadata]])`: 按平台分组的仓库文件列表
+    :param front_coding`(bool)`: 是否使用前缀压缩编码路径列表
+    :return `dict[str, Any]`: 紧凑格式的仓库文件列表
+    """
+    compact: dict[str, Any] = {"format": COMPACT_FORMAT, "version": 1}
+    for platform, repos in repo_data.items():
+        compact[platform] = [encode_compact_repo_data(repo, front_coding) for repo in repos]
+    return compact
+
+
+def decode_compact_repo_list(compact: dict[str, Any]) -> dict[str, list[RepoMetadata]]:
+    """将紧凑格式的全部仓库文件列表还原为 repo_file_list.json 的结构
+
+    :param compact`(dict[str, Any])`: 紧凑格式的仓库文件列表
+    :return `dict[str, list[RepoMetadata]]`: 按平台分组的仓库文件列表
+    """
+    return {
+        platform: [decode_compact_repo_data(repo) for repo in repos]
+        for platform, repos in compact.items()
+        if isinstance(repos, list)
+    }
+
+
+SEARCH_INDEX_DIRNAME = "search_index"
+# 版本号, 如 v1.5, 1_5, 2.0.1, 统一为以 . 分隔的形式
+VERSION_PATTERN = re.compile(r"(?<![a-z0-9])v?(\d+(?:[._]\d+)+)(?![a-z0-9])")
+TOKEN_SPLIT_PATTERN = re.compile(r"[\W_]+")
+
+
+def tokenize_search_text(text: str) -> set[str]:
+    """将文件路径或搜索词拆分为规范化的搜索词元
+
+    - 转换为小写
+    - 版本号统一为以 . 分隔的形式, 如 `V1_5` 和 `v1.5` 均为 `1.5`
+    - 按 `/`, `_`, `-`, `.`, 空格等分隔符拆分
+    - 单独的 `v<数字>` 去掉前缀 `v`
+
+    :param text`(str)`: 文件路径或搜索词
+    :return `set[str]`: 搜索词元
+    """
+    text = text.lower()
+    tokens = {re.sub(r"[._]", ".", match.group(1)) for match in VERSION_PATTERN.finditer(text)}
+    for token in TOKEN_SPLIT_PATTERN.split(VERSION_PATTERN.sub(" ", text)):
+        if not token:
+            continue
+        if re.fullmatch(r"v\d+", token):
+            token = token[1:]
+        tokens.add(token)
+    return tokens
+
+
+def build_search_index(
+    repo_data: dict[str, list[RepoMetadata]],
+    prefix_length: int = 2,
+    document_shard_size: int = 1000,
+) -> tuple[dict[str, Any], dict[str, dict[str, Any]], list[list[list[Any]]]]:
+    """为仓库文件列表构建按词元前缀分片的倒排索引
+
+    文件 ID 按仓库列表顺序依次编号, 每个词元分片只包含以该前缀开头的词元到文件 ID 的映射,
+    文件的仓库序号和路径按文件 ID 范围保存在文档分片中, 每个文件只保存一次,
+    `safetensors` 等常见词元不会使对应的词元分片膨胀为完整的文件列表,
+    无法通过仓库链接模板还原的链接一并保存在文档中
+
+    查询时先下载词元前缀对应的词元分片得到文件 ID, 再按 `文件 ID // document_shard_size` 下载所需的文档分片
+
+    :param repo_data`(dict[str, list[RepoMetadata]])`: 按平台分组的仓库文件列表
+    :param prefix_length`(int)`: 分片使用的词元前缀长度
+    :param document_shard_size`(int)`: 每个文档分片包含的文件数量
+    :return `tuple[dict[str, Any], dict[str, dict[str, Any]], list[list[list[Any]]]]`: 索引清单, `{<前缀>: <词元分片内容>}` 和按文件 ID 顺序排列的文档分片
+    """
+    repos: list[dict[str, str]] = []
+    documents: list[list[Any]] = []
+    postings: dict[str, list[int]] = {}
+    for platform, repo_list in repo_data.items():
+        for repo in repo_list:
+            if not repo["files"]:
+                continue
+
+            url_template, path_encoding = infer_url_template(repo["files"])
+            repo_index = len(repos)
+            repos.append(
+                {
+                    "platform": platform,
+                    "repo_id": repo["repo_id"],
+                    "repo_type": repo["repo_type"],
+                    "url_template": url_template,
+                    "path_encoding": path_encoding,
+                }
+            )
+            for path, url in repo["files"]:
+                file_id = len(documents)
+                document: list[Any] = [repo_index, path]
+                if not url_template or build_repo_file_url(url_template, path_encoding, path) != url:
+                    document.append(url)
+                documents.append(document)
+                for token in tokenize_search_text(path):
+                    postings.setdefault(token, []).append(file_id)
+
+    shards: dict[str, dict[str, Any]] = {}
+    for token in sorted(postings):
+        shard = shards.setdefault(token[:prefix_length], {"tokens": {}})
+        shard["tokens"][token] = postings[token]
+
+    document_shards = [
+        documents[start:start + document_shard_size] for start in range(0, len(documents), document_shard_size)
+    ]
+    manifest = {
+        "version": 2,
+        "prefix_length": prefix_length,
+        "total_files": len(documents),
+        "total_tokens": len(postings),
+        "repos": repos,
+        "documents": {
+            "shard_size": document_shard_size,
+            "path_template": "documents/{shard}.json",
+            "count": len(document_shards),
+        },
+        "shards": {
+            prefix: {
+                "path": f"shards/{prefix.encode('utf-8').hex()}.json",
+                "tokens": len(shard["tokens"]),
+            }
+            for prefix, shard in shards.items()
+        },
+    }
+    return manifest, shards, document_shards
+
+
+def write_search_index(
+    root_dir: Path,
+    repo_data: dict[str, list[RepoMetadata]],
+    prefix_length: int = 2,
+    document_shard_size: int = 1000,
+) -> None:
+    """写入按词元前缀分片的搜索索引和按文件 ID 范围分片的文档, 并删除已不存在的旧分片
+
+    :param root_dir`(Path)`: 搜索索引输出目录
+    :param repo_data`(dict[str, list[RepoMetadata]])`: 按平台分组的仓库文件列表
+    :param prefix_length`(int)`: 分片使用的词元前缀长度
+    :param document_shard_size`(int)`: 每个文档分片包含的文件数量
+    """
+    manifest, shards, document_shards = build_search_index(repo_data, prefix_length, document_shard_size)
+    contents: dict[str, Any] = {manifest["shards"][prefix]["path"]: shard for prefix, shard in shards.items()}
+    for shard_index, document_shard in enumerate(document_shards):
+        relative_path = manifest["documents"]["path_template"].format(shard=shard_index)
+        contents[relative_path] = {"start": shard_index * document_shard_size, "files": document_shard}
+
+    for relative_path, content in contents.items():
+        shard_file = root_dir / relative_path
+        shard_file.parent.mkdir(parents=True, exist_ok=True)
+        shard_file.write_text(json.dumps(content, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+
+    for dirname in ("shards", "documents"):
+        for path in sorted((root_dir / dirname).glob("*.json")):
+            if path.relative_to(root_dir).as_posix() not in contents:
+                path.unlink()
+
+    (root_dir / "index.json").write_text(
+        json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+    )
+    print(
+        f"搜索索引已保存到: {root_dir}, 文件数量: {manifest['total_files']}, "
+        f"词元数量: {manifest['total_tokens']}, 词元分片数量: {len(shards)}, 文档分片数量: {len(document_shards)}"
+    )
+
+
+CHANGES_DIRNAME = "changes"
+LATEST_CHANGES_FILENAME = "latest_changes.json"
+RepoFileKey: TypeAlias = tuple[str, str, str, str, str]
+
+
+def collect_repo_file_keys(
+    repo_data: dict[str, list[RepoMetadata]] | dict[str, PreviousRepoData],
+    skip_repos: set[tuple[str, str, str]] | None = None,
+) -> dict[RepoFileKey, tuple[str, RepoFileMetadata]]:
+    """将仓库文件列表展开为 `(平台, 仓库 ID, 仓库类型, 路径, 内容标识)` 集合
+
+    内容标识优先使用 sha256, HuggingFace 仓库中没有 sha256 的非 LFS 文件使用 Git blob ID,
+    两者都没有时为空字符串, 此时只能检测新增和删除的文件
+
+    :param repo_data`(dict[str, list[RepoMetadata]] | dict[str, PreviousRepoData])`: 按平台分组的仓库文件列表
+    :param skip_repos`(set[tuple[str, str, str]] | None)`: 需要跳过的 `(平台, 仓库 ID, 仓库类型)`
+    :return `dict[RepoFileKey, tuple[str, RepoFileMetadata]]`: 文件键到文件链接和元数据的映射
+    """
+    skip_repos = skip_repos or set()
+    keys: dict[RepoFileKey, tuple[str, RepoFileMetadata]] = {}
+    for platform, repos in repo_data.items():
+        for repo in repos.values() if isinstance(repos, dict) else repos:
+            if (platform, repo["repo_id"], repo["repo_type"]) in skip_repos:
+                continue
+            file_metadata = repo.get("file_metadata", {})
+            for path, url in repo["files"]:
+                metadata = file_metadata.get(path, {})
+                content_id = metadata.get("sha256") or metadata.get("blob_id", "")
+                keys[(platform, repo["repo_id"], repo["repo_type"], path, content_id)] = (url, metadata)
+    return keys
+
+
+def build_change_feed(
+    previous: dict[str, PreviousRepoData],
+    repo_data: dict[str, list[RepoMetadata]],
+) -> dict[str, Any]:
+    """对比上一次和本次的仓库文件列表, 生成新增, 修改和删除的文件列表
+
+    本次获取失败的仓库不参与对比, 避免将其全部文件误报为删除
+
+    :param previous`(dict[str, PreviousRepoData])`: 上一次的仓库文件列表
+    :param repo_data`(dict[str, list[RepoMetadata]])`: 本次的仓库文件列表
+    :return `dict[str, Any]`: 变更内容 `{"added": [...], "modified": [...], "removed": [...]}`
+    """
+    failed_repos = {
+        (platform, repo["repo_id"], repo["repo_type"])
+        for platform, repos in repo_data.items()
+        for repo in repos
+        if "error" in repo
+    }
+    old_keys = collect_repo_file_keys(previous, failed_repos)
+    new_keys = collect_repo_file_keys(repo_data, failed_repos)
+    old_content_ids = {key[:4]: key[4] for key in old_keys}
+    new_paths = {key[:4] for key in new_keys}
+
+    def _entry(key: RepoFileKey, value: tuple[str, RepoFileMetadata] | None = None) -> dict[str, Any]:
+        platform, repo_id, repo_type, path, _ = key
+        entry: dict[str, Any] = {
+            "platform": platform,
+            "repo_id": repo_id,
+            "repo_type": repo_type,
+            "path": path,
+        }
+        if value is not None:
+            entry["url"] = value[0]
+            entry.update(value[1])
+        return entry
+
+    added: list[dict[str, Any]] = []
+    modified: list[dict[str, Any]] = []
+    for key in sorted(set(new_keys) - set(old_keys)):
+        if key[:4] not in old_content_ids:
+            added.append(_entry(key, new_keys[key]))
+        elif key[4] and old_content_ids[key[:4]]:
+            # 任意一侧缺少内容标识时无法判断文件是否被修改
+            modified.append(_entry(key, new_keys[key]))
+    removed = [
+        _entry(key)
+        for key in sorted(set(old_keys) - set(new_keys))
+        if key[:4] not in new_paths
+    ]
+    return {
+        "added": added,
+        "modified": modified,
+        "removed": removed,
+    }
+
+
+def write_change_feed(
+    root_dir: Path,
+    previous: dict[str, PreviousRepoData],
+    repo_data: dict[str, list[RepoMetadata]],
+    keep_feeds: int = 30,
+) -> None:
+    """写入 `changes/<时间戳>.json` 变更记录和 `latest_changes.json`
+
+    没有变更时只更新 `latest_changes.json`, `changes/` 中只保留最新的 `keep_feeds` 个变更记录
+
+    :param root_dir`(Path)`: 输出目录
+    :param previous`(dict[str, PreviousRepoData])`: 上一次的仓库文件列表
+    :param repo_data`(dict[str, list[RepoMetadata]])`: 本次的仓库文件列表
+    :param keep_feeds`(int)`: 保留的变更记录数量
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    changes = build_change_feed(previous, repo_data)
+    feed: dict[str, Any] = {
+        "generated_at": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "counts": {kind: len(entries) for kind, entries in changes.items()},
+        **changes,
+    }
+    if any(feed["counts"].values()):
+        feed_path = f"{CHANGES_DIRNAME}/{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+        feed["feed"] = feed_path
+        save_list_to_json(root_dir / feed_path, feed, compact=True)
+
+    # 文件名为时间戳, 按文件名排序即按时间排序
+    feed_files = sorted((root_dir / CHANGES_DIRNAME).glob("*.json"))
+    for old_feed in feed_files[: max(len(feed_files) - keep_feeds, 0)]:
+        old_feed.unlink()
+        print(f"删除过期的变更记录: {old_feed.name}")
+
+    save_list_to_json(root_dir / LATEST_CHANGES_FILENAME, feed, compact=True)
+    print(
+        f"仓库文件变更: 新增 {feed['counts']['added']}, "
+        f"修改 {feed['counts']['modified']}, 删除 {feed['counts']['removed']}"
+    )
 
 
 class RepoInfo(TypedDict):
@@ -287,30 +1216,169 @@ class RepoInfo(TypedDict):
 RepoInfoList = list[RepoInfo]
 
 
+def build_repos_data_concurrently(
+    repo_info_list: RepoInfoList,
+    build_func: Callable[[str, Literal["model", "dataset", "space"]], RepoMetadata],
+    platform: str,
+    max_workers: int = 4,
+    on_complete: Callable[[RepoMetadata], None] | None = None,
+    retain_files: bool = True,
+    previous: PreviousRepoData | None = None,
+) -> list[RepoMetadata]:
+    """并发获取多个仓库的文件列表
+
+    每个仓库的失败相互隔离, 失败的仓库生成带有 `error` 字段的条目, 上一次的条目中有文件列表时保留该文件列表,
+    避免覆盖已发布的正常分片, 否则文件列表为空, 返回结果的顺序与输入顺序一致
+
+    :param repo_info_list`(RepoInfoList)`: 仓库信息列表
+    :param build_func`(Callable[[str, Literal["model", "dataset", "space"]], RepoMetadata])`: 获取单个仓库文件列表的函数
+    :param platform`(str)`: 平台名称, 用于日志显示
+    :param max_workers`(int)`: 最大并发数
+    :param on_complete`(Callable[[RepoMetadata], None] | None)`: 单个仓库获取完成 (包括失败) 后立即调用的回调, 用于流式写入
+    :param retain_files`(bool)`: 是否在返回结果中保留文件列表, 为`False`时返回结果中的 `files` 为空列表以减少内存占用
+    :param previous`(PreviousRepoData | None)`: 上一次的仓库文件列表, 仓库获取失败时保留其中的文件列表
+    :return `list[RepoMetadata]`: 仓库文件列表
+    """
+    if not repo_info_list:
+        return []
+    previous = previous or {}
+
+    def _build(repo_info: RepoInfo) -> RepoMetadata:
+        repo_id = repo_info["repo_id"]
+        repo_type = repo_info["repo_type"]
+        start = time.perf_counter()
+        try:
+            data = build_func(repo_id, repo_type)
+            print(
+                f"获取 {platform} 仓库 {repo_id} (类型: {repo_type}) 的文件列表完成, "
+                f"文件数量: {len(data['files'])}, 耗时: {time.perf_counter() - start:.2f} 秒"
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(
+                f"获取 {platform} 仓库 {repo_id} (类型: {repo_type}) 的文件列表失败, "
+                f"耗时: {time.perf_counter() - start:.2f} 秒: {e}"
+            )
+            previous_data = previous.get((repo_id, repo_type))
+            if previous_data is not None and previous_data.get("files"):
+                print(f"保留 {platform} 仓库 {repo_id} (类型: {repo_type}) 上一次的文件列表")
+                data = cast(RepoMetadata, {**previous_data, "error": str(e)})
+            else:
+                data = {
+                    "repo_id": repo_id,
+                    "repo_type": repo_type,
+                    "files": [],
+                    "error": str(e),
+                }
+
+        if on_complete is not None:
+            on_complete(data)
+        if not retain_files:
+            data = cast(RepoMetadata, {**data, "files": []})
+            data.pop("file_metadata", None)
+        return data
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # executor.map 保持输入顺序
+        result = list(executor.map(_build, repo_info_list))
+
+    print(f"获取 {platform} 全部仓库文件列表耗时: {time.perf_counter() - start:.2f} 秒")
+    return result
+
+
 def build_hf_repos_data(
     repo_info_list: RepoInfoList,
+    max_workers: int = 4,
+    previous: PreviousRepoData | None = None,
+    on_complete: Callable[[RepoMetadata], None] | None = None,
+    retain_files: bool = True,
+    with_metadata: bool = False,
+    tree_workers: int = 1,
 ) -> list[RepoMetadata]:
-    return [
-        build_hf_repo_data(repo_id=repo_info["repo_id"], repo_type=repo_info["repo_type"])
-        for repo_info in repo_info_list
-    ]
+    previous = previous or {}
+    return build_repos_data_concurrently(
+        repo_info_list=repo_info_list,
+        build_func=lambda repo_id, repo_type: build_hf_repo_data(
+            repo_id=repo_id,
+            repo_type=repo_type,
+            previous=previous.get((repo_id, repo_type)),
+            with_metadata=with_metadata,
+            tree_workers=tree_workers,
+        ),
+        platform="HuggingFace",
+        max_workers=max_workers,
+        on_complete=on_complete,
+        retain_files=retain_files,
+        previous=previous,
+    )
 
 def build_ms_repos_data(
     repo_info_list: RepoInfoList,
+    max_workers: int = 4,
+    previous: PreviousRepoData | None = None,
+    on_complete: Callable[[RepoMetadata], None] | None = None,
+    retain_files: bool = True,
+    with_metadata: bool = False,
 ) -> list[RepoMetadata]:
-    return [
-        build_ms_repo_data(repo_id=repo_info["repo_id"], repo_type=repo_info["repo_type"])
-        for repo_info in repo_info_list
-    ]
+    previous = previous or {}
+    return build_repos_data_concurrently(
+        repo_info_list=repo_info_list,
+        build_func=lambda repo_id, repo_type: build_ms_repo_data(
+            repo_id=repo_id,
+            repo_type=repo_type,
+            previous=previous.get((repo_id, repo_type)),
+            with_metadata=with_metadata,
+        ),
+        platform="ModelScope",
+        max_workers=max_workers,
+        on_complete=on_complete,
+        retain_files=retain_files,
+        previous=previous,
+    )
 
 def build_repo_info_data(
     hf_repo_info_list: RepoInfoList,
     ms_repo_info_list: RepoInfoList,
+    hf_max_workers: int = 4,
+    ms_max_workers: int = 4,
+    previous: dict[str, PreviousRepoData] | None = None,
+    shard_writer: ShardedRepoListWriter | None = None,
+    retain_files: bool = True,
+    with_metadata: bool = False,
+    hf_tree_workers: int = 1,
 ) -> dict[str, list[RepoMetadata]]:
-    return {
-        "huggingface": build_hf_repos_data(repo_info_list=hf_repo_info_list),
-        "modelscope": build_ms_repos_data(repo_info_list=ms_repo_info_list),
-    }
+    previous = previous or {}
+
+    def _on_complete(platform: str) -> Callable[[RepoMetadata], None] | None:
+        if shard_writer is None:
+            return None
+        return lambda data: shard_writer.write_repo(platform, data)
+
+    # 两个平台同时获取, 各自使用独立的并发限制
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hf_future = executor.submit(
+            build_hf_repos_data,
+            repo_info_list=hf_repo_info_list,
+            max_workers=hf_max_workers,
+            previous=previous.get("huggingface"),
+            on_complete=_on_complete("huggingface"),
+            retain_files=retain_files,
+            with_metadata=with_metadata,
+            tree_workers=hf_tree_workers,
+        )
+        ms_future = executor.submit(
+            build_ms_repos_data,
+            repo_info_list=ms_repo_info_list,
+            max_workers=ms_max_workers,
+            previous=previous.get("modelscope"),
+            on_complete=_on_complete("modelscope"),
+            retain_files=retain_files,
+            with_metadata=with_metadata,
+        )
+        return {
+            "huggingface": hf_future.result(),
+            "modelscope": ms_future.result(),
+        }
 
 
 
@@ -348,6 +1416,10 @@ def parse_repo_env(env_value: str | None) -> RepoInfoList:
     return repo_list
 
 
+# 仓库列表与其他页面发布在同一个 gh-pages 分支的根目录, 使用独立的预压缩哈希清单
+REPO_LIST_PRECOMPRESS_MANIFEST = ".repo_list.precompress.json"
+
+
 def main() -> None:
     '''主函数'''
     root_path = os.environ.get("ROOT_PATH")
@@ -363,16 +1435,86 @@ def main() -> None:
     
     print(f"解析到 HuggingFace 仓库数量: {len(hf_repo_info_list)}")
     print(f"解析到 ModelScope 仓库数量: {len(ms_repo_info_list)}")
-    
+
+    # 输出格式: full (单个 repo_file_list.json), sharded (按仓库分片), both (同时输出)
+    output_format = os.environ.get("REPO_LIST_FORMAT", "both")
+    if output_format not in ("full", "sharded", "both"):
+        print(f"警告: 未知的输出格式 {output_format}, 使用 both")
+        output_format = "both"
+    build_index = os.environ.get("REPO_LIST_SEARCH_INDEX") in ("1", "true", "True")
+    shard_writer = (
+        ShardedRepoListWriter(Path(root_path) / "repo_file_list")
+        if root_path and output_format != "full"
+        else None
+    )
+
+    previous = load_previous_repo_data(os.environ.get("PREVIOUS_REPO_LIST"))
+    build_changes = bool(previous) and os.environ.get("REPO_LIST_CHANGE_FEED") in ("1", "true", "True")
     repo_data = build_repo_info_data(
         hf_repo_info_list=hf_repo_info_list,
         ms_repo_info_list=ms_repo_info_list,
+        hf_max_workers=int(os.environ.get("HF_CONCURRENCY", "4")),
+        ms_max_workers=int(os.environ.get("MS_CONCURRENCY", "4")),
+        previous=previous,
+        shard_writer=shard_writer,
+        # 只输出分片且不需要完整文件列表时不在内存中保留全部文件列表
+        retain_files=not (root_path and output_format == "sharded" and not build_index and not build_changes),
+        # 通过仓库树接口同时获取文件大小和 sha256 (HuggingFace 非 LFS 文件为 Git blob ID), ModelScope 仓库附带最后修改时间
+        with_metadata=os.environ.get("REPO_LIST_METADATA") in ("1", "true", "True"),
+        # 单个 HuggingFace 仓库内按顶层目录并行获取文件树
+        hf_tree_workers=int(os.environ.get("HF_TREE_CONCURRENCY", "1")),
     )
+    failed_repos = [
+        f"{platform}:{repo['repo_id']}"
+        for platform, repos in repo_data.items()
+        for repo in repos
+        if "error" in repo
+    ]
+    if failed_repos:
+        print(f"以下仓库获取文件列表失败: {', '.join(failed_repos)}")
     
     if root_path:
-        output_path = os.path.join(root_path, "repo_file_list.json")
-        save_list_to_json(output_path, repo_data)
-        print(f"仓库列表已保存到: {output_path}")
+        if shard_writer is not None:
+            shard_writer.write_manifest(repo_data)
+        if output_format != "sharded":
+            output_path = os.path.join(root_path, "repo_file_list.json")
+            save_list_to_json(output_path, repo_data)
+            print(f"仓库列表已保存到: {output_path}")
+            if os.environ.get("REPO_LIST_COMPACT") in ("1", "true", "True"):
+                compact_path = os.path.join(root_path, "repo_file_list.compact.json")
+                compact_data = encode_compact_repo_list(
+                    repo_data,
+                    front_coding=os.environ.get("REPO_LIST_FRONT_CODING") in ("1", "true", "True"),
+                )
+                save_list_to_json(compact_path, compact_data, compact=True)
+                print(f"紧凑格式仓库列表已保存到: {compact_path}")
+        if build_index:
+            write_search_index(
+                Path(root_path) / SEARCH_INDEX_DIRNAME,
+                repo_data,
+                prefix_length=int(os.environ.get("SEARCH_INDEX_PREFIX_LENGTH", "2")),
+                document_shard_size=int(os.environ.get("SEARCH_INDEX_DOCUMENT_SHARD_SIZE", "1000")),
+            )
+        if build_changes:
+            write_change_feed(
+                Path(root_path),
+                previous,
+                repo_data,
+                keep_feeds=int(os.environ.get("CHANGE_FEED_KEEP", "30")),
+            )
+        precompress_directory(
+            Path(root_path),
+            (".json",),
+            include=(
+                "repo_file_list.json",
+                "repo_file_list.compact.json",
+                "repo_file_list",
+                SEARCH_INDEX_DIRNAME,
+                CHANGES_DIRNAME,
+                LATEST_CHANGES_FILENAME,
+            ),
+            manifest_name=REPO_LIST_PRECOMPRESS_MANIFEST,
+        )
     else:
         print(json.dumps(repo_data, ensure_ascii=False, indent=2))
 
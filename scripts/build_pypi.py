@@ -1,4 +1,19 @@
+import io
 import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import hashlib
+import argparse
+import datetime
+import threading
+from tempfile import TemporaryDirectory
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, TypedDict
 from pathlib import Path
 
 import requests
@@ -9,6 +24,44 @@ from sd_webui_all_in_one.package_analyzer import (
 from sd_webui_all_in_one.retry_decorator import retryable
 from sd_webui_all_in_one.repo_manager import RepoManager
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from github_release import (  # noqa: E402
+    get_github_cache_dir,
+    get_github_release_by_tag,
+    prune_github_cache,
+)
+from ms_repo_tree import list_modelscope_repo_tree  # noqa: E402
+from precompress import precompress_directory  # noqa: E402
+
+
+class WheelFileMetadata(TypedDict, total=False):
+    """仓库文件列表中附带的文件元数据"""
+
+    size: int
+    upload_time: str
+    sha256: str
+
+
+def format_upload_time(
+    value: datetime.datetime | int | float | str | None,
+) -> str | None:
+    """
+    将上传时间转换为 PEP 700 要求的 ISO 8601 UTC 时间格式
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)):
+        value = datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
 
 
 @retryable(
@@ -21,27 +74,44 @@ from sd_webui_all_in_one.repo_manager import RepoManager
 def get_github_release_file(
     repo: str,
     tag: str,
+    cache_dir: Path | None = None,
 ) -> list[tuple[str, str]]:
-    url = f"https://api.github.com/repos/{repo}/releases"
-    data = {
-        "Accept": "application/vnd.github+json",
-    }
-    file_list = []
-
     print(f"获取 {repo} 的文件列表")
-    response = requests.get(url=url, data=data, timeout=30)
-    res = response.json()
-    if response.status_code < 200 or response.status_code > 300:
-        error_msg = f"获取 {repo} 的文件列表失败，状态码: {response.status_code}"
-        print(error_msg)
-        raise RuntimeError(error_msg)
+    release = get_github_release_by_tag(repo, tag, cache_dir or get_github_cache_dir())
+    if release is None:
+        print(f"{repo} 中未找到标签为 {tag} 的 Release")
+        return []
 
-    for i in res:
-        if i.get("tag_name") == tag:
-            for x in i.get("assets"):
-                file_list.append((x.get("name"), x.get("browser_download_url")))
+    return [(x.get("name"), x.get("browser_download_url")) for x in release.get("assets", [])]
 
-    return file_list
+
+def get_github_release_file_metadata(
+    repo: str,
+    tag: str,
+    cache_dir: Path | None = None,
+) -> dict[str, WheelFileMetadata]:
+    """
+    从 Release 资源信息中获取文件大小, 上传时间和 sha256 (digest 字段)
+    返回: {文件名: 元数据}
+    """
+    release = get_github_release_by_tag(repo, tag, cache_dir or get_github_cache_dir())
+    if release is None:
+        return {}
+
+    metadata: dict[str, WheelFileMetadata] = {}
+    for asset in release.get("assets", []):
+        file_metadata: WheelFileMetadata = {}
+        if asset.get("size") is not None:
+            file_metadata["size"] = int(asset["size"])
+        upload_time = format_upload_time(asset.get("updated_at"))
+        if upload_time is not None:
+            file_metadata["upload_time"] = upload_time
+        digest = asset.get("digest") or ""
+        if digest.startswith("sha256:"):
+            file_metadata["sha256"] = digest[len("sha256:") :]
+        metadata[asset.get("name")] = file_metadata
+
+    return metadata
 
 
 @retryable(
@@ -51,28 +121,48 @@ def get_github_release_file(
     catch_exceptions=Exception,
     raise_exception=RuntimeError,
 )
-def get_huggingface_repo_file(
+def get_huggingface_repo_file_with_metadata(
     repo_id: str,
     repo_type: str,
-) -> list[tuple[str, str]]:
+) -> tuple[list[tuple[str, str]], dict[str, WheelFileMetadata]]:
+    """
+    通过一次递归的仓库树请求获取文件列表, 同时获取文件大小和 LFS sha256
+
+    不使用 expand 参数, expand 会将每页返回的文件数量从 1000 降低到 50, 因此不获取最后提交时间
+
+    返回: ([(文件路径, URL), ...], {文件名: 元数据})
+    """
+    from huggingface_hub import HfApi
+    from huggingface_hub.hf_api import RepoFile
+
     repo_manager = RepoManager()
-    repo_files = repo_manager.get_repo_file(
-        api_type="huggingface",
+    file_list: list[tuple[str, str]] = []
+    metadata: dict[str, WheelFileMetadata] = {}
+    for item in HfApi().list_repo_tree(
         repo_id=repo_id,
         repo_type=repo_type,
-    )
-    return [
-        (
-            file_path,
-            repo_manager.get_repo_file_download_url(
-                api_type="huggingface",
-                repo_id=repo_id,
-                file_path=file_path,
-                repo_type=repo_type,
-            ),
+        recursive=True,
+    ):
+        if not isinstance(item, RepoFile):
+            continue
+
+        file_list.append(
+            (
+                item.path,
+                repo_manager.get_repo_file_download_url(
+                    api_type="huggingface",
+                    repo_id=repo_id,
+                    file_path=item.path,
+                    repo_type=repo_type,
+                ),
+            )
         )
-        for file_path in repo_files
-    ]
+        file_metadata: WheelFileMetadata = {"size": item.size}
+        if item.lfs is not None:
+            file_metadata["sha256"] = item.lfs.sha256
+        metadata[os.path.basename(item.path)] = file_metadata
+
+    return file_list, metadata
 
 
 @retryable(
@@ -82,28 +172,331 @@ def get_huggingface_repo_file(
     catch_exceptions=Exception,
     raise_exception=RuntimeError,
 )
-def get_modelscope_repo_file(
+def get_modelscope_repo_file_with_metadata(
     repo_id: str,
     repo_type: str,
-) -> list[tuple[str, str]]:
+) -> tuple[list[tuple[str, str]], dict[str, WheelFileMetadata]]:
+    """
+    通过一次 ModelScope 文件列表请求获取文件列表, 同时获取文件大小, sha256 和提交时间
+
+    返回: ([(文件路径, URL), ...], {文件名: 元数据})
+    """
     repo_manager = RepoManager()
-    repo_files = repo_manager.get_repo_file(
-        api_type="modelscope",
-        repo_id=repo_id,
-        repo_type=repo_type,
+    file_list: list[tuple[str, str]] = []
+    metadata: dict[str, WheelFileMetadata] = {}
+    for item in list_modelscope_repo_tree(repo_id, repo_type):
+        if item.get("Type") == "tree" or not item.get("Path"):
+            continue
+
+        file_list.append(
+            (
+                item["Path"],
+                repo_manager.get_repo_file_download_url(
+                    api_type="modelscope",
+                    repo_id=repo_id,
+                    file_path=item["Path"],
+                    repo_type=repo_type,
+                ),
+            )
+        )
+        file_metadata: WheelFileMetadata = {}
+        if item.get("Size") is not None:
+            file_metadata["size"] = int(item["Size"])
+        if item.get("Sha256"):
+            file_metadata["sha256"] = item["Sha256"]
+        upload_time = format_upload_time(item.get("CommittedDate"))
+        if upload_time is not None:
+            file_metadata["upload_time"] = upload_time
+        metadata[os.path.basename(item["Path"])] = file_metadata
+
+    return file_list, metadata
+
+
+class HttpRangeFile(io.RawIOBase):
+    """
+    基于 HTTP Range 请求的只读文件对象
+
+    配合 zipfile 使用时只会下载 zip 中央目录和目标文件所在的字节范围
+    """
+
+    def __init__(
+        self,
+        url: str,
+        session: requests.Session | None = None,
+    ) -> None:
+        self.url = url
+        self.session = session or requests.Session()
+        self._pos = 0
+        response = self.session.head(url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        if response.headers.get("Accept-Ranges", "bytes") != "bytes":
+            raise ValueError(f"服务器不支持 Range 请求: {url}")
+        self.url = response.url
+        self.size = int(response.headers["Content-Length"])
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"无效的 whence 参数: {whence}")
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size or len(buffer) == 0:
+            return 0
+
+        end = min(self._pos + len(buffer), self.size) - 1
+        response = self.session.get(
+            self.url,
+            headers={"Range": f"bytes={self._pos}-{end}"},
+            timeout=30,
+        )
+        if response.status_code != 206:
+            raise ValueError(f"Range 请求失败, 状态码: {response.status_code}")
+
+        data = response.content
+        buffer[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def read_wheel_metadata(
+    wheel: zipfile.ZipFile,
+    filename: str,
+) -> str:
+    """
+    从 wheel 中读取 *.dist-info/METADATA 文件内容
+    """
+    for name in wheel.namelist():
+        parts = name.split("/")
+        if len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "METADATA":
+            return wheel.read(name).decode("utf-8")
+
+    raise ValueError(f"{filename} 中未找到 METADATA 文件")
+
+
+@retryable(
+    times=3,
+    delay=1.0,
+    describe="提取 wheel 元数据",
+    catch_exceptions=(requests.RequestException, ValueError, zipfile.BadZipFile),
+    raise_exception=RuntimeError,
+)
+def extract_wheel_metadata(
+    filename: str,
+    url: str,
+    local_dir: Path | None = None,
+) -> str:
+    """
+    提取 wheel 的 METADATA 文件
+
+    本地镜像目录中存在该 wheel 时直接读取本地文件, 否则通过 HTTP Range 请求只读取
+    zip 中央目录和 METADATA 所在的部分, 不下载完整的 wheel
+    """
+    if local_dir is not None and (local_dir / filename).is_file():
+        with zipfile.ZipFile(local_dir / filename) as wheel:
+            return read_wheel_metadata(wheel, filename)
+
+    # 使用缓冲读取合并 zipfile 的小块读取, 减少请求次数
+    with io.BufferedReader(HttpRangeFile(url), buffer_size=64 * 1024) as f:
+        with zipfile.ZipFile(f) as wheel:
+            return read_wheel_metadata(wheel, filename)
+
+
+def collect_core_metadata(
+    file_list: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+    cache_dir: Path,
+    local_dir: Path | None = None,
+) -> dict[str, str]:
+    """
+    获取文件列表中 wheel 的 METADATA 文件 (PEP 658), 用于上传元数据文件和本地索引代理服务器提供元数据文件
+
+    提取结果按 wheel 的 sha256 缓存在 cache_dir 中, 每个 wheel 只需要提取一次,
+    没有 sha256 信息的 wheel 将被跳过
+
+    返回: {文件名: METADATA 内容}
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    core_metadata: dict[str, str] = {}
+    fetched = 0
+
+    for file_path, url in file_list:
+        filename = os.path.basename(file_path)
+        sha256 = file_metadata.get(filename, {}).get("sha256")
+        if not sha256:
+            continue
+
+        cache_file = cache_dir / f"{sha256}.metadata"
+        if cache_file.is_file():
+            core_metadata[filename] = cache_file.read_text(encoding="utf-8")
+            continue
+
+        try:
+            metadata = extract_wheel_metadata(filename, url, local_dir)
+        except RuntimeError as e:
+            print(f"提取 {filename} 的元数据失败: {e}")
+            continue
+
+        cache_file.write_text(metadata, encoding="utf-8")
+        core_metadata[filename] = metadata
+        fetched += 1
+
+    print(f"获取 wheel 元数据完成, 共 {len(core_metadata)} 个, 新提取 {fetched} 个")
+    return core_metadata
+
+
+@retryable(
+    times=3,
+    delay=1.0,
+    describe="下载 wheel 元数据文件",
+    catch_exceptions=requests.RequestException,
+    raise_exception=RuntimeError,
+)
+def download_metadata_file(
+    url: str,
+) -> bytes:
+    """
+    下载源仓库中发布的 <wheel>.metadata 文件
+    """
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def collect_published_metadata_hashes(
+    file_list: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+    cache_dir: Path,
+    max_workers: int = 8,
+) -> dict[str, str]:
+    """
+    获取源仓库中已经发布的 <wheel>.metadata 文件的 sha256 (PEP 658)
+
+    PEP 658 要求元数据文件位于 wheel 链接加上 .metadata 后缀的地址, pip 会下载该文件并校验索引中声明的哈希,
+    因此哈希根据源仓库中的元数据文件本身计算, 只有发布了元数据文件的 wheel 可以声明 data-core-metadata
+
+    文件列表已提供元数据文件的 sha256 时直接使用, 否则下载元数据文件计算, 计算结果按 wheel 的 sha256
+    和元数据文件大小缓存在 cache_dir 中
+
+    返回: {wheel 文件名: 元数据文件 sha256}
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    metadata_hashes: dict[str, str] = {}
+    pending: list[tuple[str, str, Path | None]] = []
+
+    for file_path, url in file_list:
+        if not file_path.endswith(".whl.metadata"):
+            continue
+
+        filename = os.path.basename(file_path)[: -len(".metadata")]
+        sidecar_metadata = file_metadata.get(os.path.basename(file_path), {})
+        if sidecar_metadata.get("sha256"):
+            metadata_hashes[filename] = sidecar_metadata["sha256"]
+            continue
+
+        wheel_sha256 = file_metadata.get(filename, {}).get("sha256")
+        cache_file = (
+            cache_dir / f"{wheel_sha256}-{sidecar_metadata['size']}.sha256"
+            if wheel_sha256 and "size" in sidecar_metadata
+            else None
+        )
+        if cache_file is not None and cache_file.is_file():
+            metadata_hashes[filename] = cache_file.read_text(encoding="utf-8").strip()
+            continue
+
+        pending.append((filename, url, cache_file))
+
+    def _download(task: tuple[str, str, Path | None]) -> bool:
+        filename, url, cache_file = task
+        try:
+            digest = hashlib.sha256(download_metadata_file(url)).hexdigest()
+        except RuntimeError as e:
+            print(f"下载 {filename} 的元数据文件失败, 不声明 PEP 658 属性: {e}")
+            return False
+
+        metadata_hashes[filename] = digest
+        if cache_file is not None:
+            cache_file.write_text(digest, encoding="utf-8")
+        return True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        downloaded = sum(executor.map(_download, pending))
+
+    print(
+        f"获取 wheel 元数据文件哈希完成, 共 {len(metadata_hashes)} 个, "
+        f"新下载 {downloaded} 个, 下载失败 {len(pending) - downloaded} 个"
     )
-    return [
-        (
-            file_path,
-            repo_manager.get_repo_file_download_url(
-                api_type="modelscope",
+    return metadata_hashes
+
+
+def upload_core_metadata_files(
+    file_list: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+    cache_dir: Path,
+    repo_manager: RepoManager,
+    api_type: str,
+    repo_id: str,
+    repo_type: str,
+) -> dict[str, str]:
+    """
+    为源仓库中缺少 <wheel>.metadata 文件的 wheel 提取 METADATA, 并上传到仓库中 wheel 所在的位置 (PEP 658)
+
+    METADATA 通过 HTTP Range 请求从 wheel 中读取, 不下载完整的 wheel, 提取结果按 wheel 的 sha256 缓存在 cache_dir 中,
+    索引中声明的哈希根据上传的文件内容计算, 与 pip 从 <wheel 链接>.metadata 下载的文件一致
+
+    返回: {wheel 文件名: 上传的元数据文件 sha256}, 上传失败时返回空字典
+    """
+    published = {file_path[: -len(".metadata")] for file_path, _ in file_list if file_path.endswith(".whl.metadata")}
+    missing = [
+        (file_path, url)
+        for file_path, url in file_list
+        if file_path.endswith(".whl") and file_path not in published
+    ]
+    if not missing:
+        return {}
+
+    core_metadata = collect_core_metadata(missing, file_metadata, cache_dir)
+    if not core_metadata:
+        return {}
+
+    repo_paths = {os.path.basename(file_path): file_path for file_path, _ in missing}
+    metadata_hashes: dict[str, str] = {}
+    with TemporaryDirectory() as upload_dir:
+        for filename, metadata in core_metadata.items():
+            content = metadata.encode("utf-8")
+            sidecar_file = Path(upload_dir) / f"{repo_paths[filename]}.metadata"
+            sidecar_file.parent.mkdir(parents=True, exist_ok=True)
+            sidecar_file.write_bytes(content)
+            metadata_hashes[filename] = hashlib.sha256(content).hexdigest()
+
+        print(f"上传 {len(metadata_hashes)} 个 wheel 元数据文件到 {api_type}:{repo_id} (类型: {repo_type})")
+        try:
+            repo_manager.upload_files_to_repo(
+                api_type=api_type,
                 repo_id=repo_id,
-                file_path=file_path,
                 repo_type=repo_type,
-            ),
-        )
-        for file_path in repo_files
-    ]
+                upload_path=Path(upload_dir),
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # 部分上传成功的元数据文件会在下一次构建时出现在文件列表中
+            print(f"上传 wheel 元数据文件失败, 不声明这些 wheel 的 PEP 658 属性: {e}")
+            return {}
+
+    return metadata_hashes
 
 
 def filter_whl_file(
@@ -175,12 +568,18 @@ def generate_package_index_html(
 
 
 def generate_package_detail_html(
-    package_name: str, files: list[tuple[str, str]]
+    package_name: str,
+    files: list[tuple[str, str]],
+    metadata_hashes: dict[str, str] | None = None,
+    file_metadata: dict[str, WheelFileMetadata] | None = None,
 ) -> str:
     """
     生成单个包的详情页面 HTML
-    根据 PEP 503 规范
+    根据 PEP 503 规范, 为已知 sha256 的文件在链接中添加 #sha256= 片段,
+    并为提供了元数据哈希的文件添加 PEP 658 / PEP 714 属性
     """
+    metadata_hashes = metadata_hashes or {}
+    file_metadata = file_metadata or {}
     html_parts = [
         "<!DOCTYPE html>",
         "<html>",
@@ -197,7 +596,13 @@ def generate_package_detail_html(
 
     for filename, url in sorted_files:
         # 根据 PEP 503，每个链接应该包含文件名
-        html_parts.append(f'    <a href="{url}">{filename}</a><br/>')
+        metadata_attr = ""
+        if filename in metadata_hashes:
+            metadata_hash = f"sha256={metadata_hashes[filename]}"
+            metadata_attr = f' data-dist-info-metadata="{metadata_hash}" data-core-metadata="{metadata_hash}"'
+        sha256 = file_metadata.get(filename, {}).get("sha256")
+        href = f"{url}#sha256={sha256}" if sha256 else url
+        html_parts.append(f'    <a href="{href}"{metadata_attr}>{filename}</a><br/>')
 
     html_parts.extend(
         [
@@ -209,71 +614,988 @@ def generate_package_detail_html(
     return "\n".join(html_parts)
 
 
-def build_pypi_index(
-    file_list: list[tuple[str, str]],
+PEP691_API_VERSION = "1.1"
+# PEP 700 要求 1.1 版本的详情页面为每个文件提供 size, 存在大小未知的文件时声明为 1.0
+PEP691_FALLBACK_API_VERSION = "1.0"
+
+
+def get_wheel_version(
+    filename: str,
+) -> str:
+    """
+    从 wheel 文件名中提取版本号
+    """
+    return filename.split("-")[1]
+
+
+def generate_package_index_json(
+    packages: dict[str, list[tuple[str, str]]],
+) -> str:
+    """
+    生成 PyPI 简单索引的主页面 JSON
+    根据 PEP 691 规范
+    """
+    data = {
+        "meta": {"api-version": PEP691_API_VERSION},
+        "projects": [{"name": package_name} for package_name in sorted(packages.keys())],
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def generate_package_detail_json(
+    package_name: str,
+    files: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata] | None = None,
+    metadata_hashes: dict[str, str] | None = None,
+) -> str:
+    """
+    生成单个包的详情页面 JSON
+    根据 PEP 691 / PEP 700 规范, 在文件列表提供时附带文件大小和上传时间,
+    存在大小未知的文件时 api-version 声明为 1.0
+    """
+    file_metadata = file_metadata or {}
+    metadata_hashes = metadata_hashes or {}
+    sorted_files = sorted(files, key=lambda x: x[0])
+    versions: set[str] = set()
+    json_files = []
+    api_version = PEP691_API_VERSION
+
+    for filename, url in sorted_files:
+        versions.add(get_wheel_version(filename))
+        metadata = file_metadata.get(filename, {})
+        file_info: dict = {
+            "filename": filename,
+            "url": url,
+            "hashes": {"sha256": metadata["sha256"]} if "sha256" in metadata else {},
+        }
+        if "size" in metadata:
+            file_info["size"] = metadata["size"]
+        else:
+            api_version = PEP691_FALLBACK_API_VERSION
+        if "upload_time" in metadata:
+            file_info["upload-time"] = metadata["upload_time"]
+        if filename in metadata_hashes:
+            file_info["core-metadata"] = {"sha256": metadata_hashes[filename]}
+            file_info["dist-info-metadata"] = {"sha256": metadata_hashes[filename]}
+        json_files.append(file_info)
+
+    data = {
+        "meta": {"api-version": api_version},
+        "name": package_name,
+        "versions": sorted(versions),
+        "files": json_files,
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+MANIFEST_FILENAME = ".manifest.json"
+
+
+def load_index_manifest(
+    output_dir: Path,
+) -> dict[str, str]:
+    """
+    读取上一次构建记录的页面哈希清单
+    返回: {页面相对路径: sha256}
+    """
+    manifest_file = output_dir / MANIFEST_FILENAME
+    if not manifest_file.is_file():
+        return {}
+
+    try:
+        data = json.loads(manifest_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"读取索引清单 {manifest_file} 失败, 将重新生成全部页面: {e}")
+        return {}
+
+    pages = data.get("pages", {}) if isinstance(data, dict) else {}
+    return {str(k): str(v) for k, v in pages.items()}
+
+
+def load_index_inputs(
+    output_dir: Path,
+) -> dict[str, str]:
+    """
+    读取上一次构建记录的包输入指纹
+    返回: {包名: 输入指纹}
+    """
+    try:
+        data = json.loads((output_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+    inputs = data.get("inputs", {}) if isinstance(data, dict) else {}
+    return {str(k): str(v) for k, v in inputs.items()}
+
+
+def save_index_manifest(
+    output_dir: Path,
+    pages: dict[str, str],
+    inputs: dict[str, str] | None = None,
+) -> None:
+    """
+    保存本次构建的页面哈希清单和包输入指纹
+    """
+    manifest_file = output_dir / MANIFEST_FILENAME
+    manifest_file.write_text(
+        json.dumps({"pages": dict(sorted(pages.items())), "inputs": dict(sorted((inputs or {}).items()))}, indent=2),
+        encoding="utf-8",
+    )
+
+
+def get_package_fingerprint(
+    files: list[tuple[str, str]],
+    file_metadata: dict[str, WheelFileMetadata],
+    metadata_hashes: dict[str, str],
+) -> str:
+    """
+    计算包的输入指纹, 包含文件名, 链接, 文件元数据和元数据文件哈希
+
+    指纹与上一次构建一致时详情页面内容不会变化, 可以跳过裁剪, 渲染和页面哈希计算
+    """
+    hasher = hashlib.sha256()
+    for filename, url in files:
+        metadata = file_metadata.get(filename, {})
+        hasher.update(
+            "\0".join(
+                (
+                    filename,
+                    url,
+                    str(metadata.get("size", "")),
+                    metadata.get("sha256", ""),
+                    metadata.get("upload_time", ""),
+                    metadata_hashes.get(filename, ""),
+                )
+            ).encode("utf-8")
+        )
+        hasher.update(b"\n")
+    return hasher.hexdigest()
+
+
+def write_page_if_changed(
+    output_dir: Path,
+    relative_path: str,
+    content: str,
+    old_manifest: dict[str, str],
+    new_manifest: dict[str, str],
+) -> str | None:
+    """
+    仅在页面内容与清单记录不一致 (或文件丢失) 时写入页面
+
+    返回: "added" / "changed" / None (未变化)
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    new_manifest[relative_path] = digest
+    page_file = output_dir / relative_path
+
+    old_digest = old_manifest.get(relative_path)
+    if old_digest == digest and page_file.is_file():
+        return None
+
+    page_file.parent.mkdir(parents=True, exist_ok=True)
+    page_file.write_text(content, encoding="utf-8")
+    return "changed" if old_digest is not None else "added"
+
+
+def remove_stale_pages(
+    output_dir: Path,
+    old_manifest: dict[str, str],
+    new_manifest: dict[str, str],
+) -> int:
+    """
+    删除已经不存在的包对应的页面
+
+    返回: 删除的页面数量
+    """
+    removed = 0
+    for relative_path in sorted(set(old_manifest) - set(new_manifest)):
+        page_file = output_dir / relative_path
+        if page_file.is_file():
+            page_file.unlink()
+        removed += 1
+        print(f"删除过期页面: {page_file}")
+
+        # 包目录为空时一并删除
+        package_dir = page_file.parent
+        if package_dir != output_dir and package_dir.is_dir() and not any(package_dir.iterdir()):
+            shutil.rmtree(package_dir, ignore_errors=True)
+
+    return removed
+
+
+def prune_package_files(
+    files: list[tuple[str, str]],
+    keep_versions: int,
+) -> list[tuple[str, str]]:
+    """
+    对每个 (Python 标签, ABI 标签, 平台标签) 组合只保留最新的 keep_versions 个版本
+
+    版本按公开版本号排序, 本地版本标识 (如 +cu128torch2.7) 不同的 wheel 属于同一版本的不同 CUDA / PyTorch 构建,
+    保留版本的全部构建都会保留
+
+    每个 wheel 的兼容性标签只解析一次, wheel 在任意一个标签组合中属于最新版本时保留,
+    无法解析的文件始终保留
+    """
+    from packaging.utils import InvalidWheelFilename, parse_wheel_filename as parse_wheel_tags
+    from packaging.version import Version
+
+    parsed: list[tuple[str, str, Any, frozenset]] = []
+    kept: set[str] = set()
+    versions_by_tag: dict[tuple[str, str, str], set] = {}
+    for filename, url in files:
+        try:
+            _, local_version, _, tags = parse_wheel_tags(filename)
+        except (InvalidWheelFilename, ValueError):
+            kept.add(filename)
+            continue
+        version = Version(local_version.public)
+        parsed.append((filename, url, version, tags))
+        for tag in tags:
+            versions_by_tag.setdefault((tag.interpreter, tag.abi, tag.platform), set()).add(version)
+
+    newest_by_tag = {
+        key: set(sorted(versions, reverse=True)[:keep_versions]) for key, versions in versions_by_tag.items()
+    }
+    for filename, _, version, tags in parsed:
+        if any(version in newest_by_tag[(tag.interpreter, tag.abi, tag.platform)] for tag in tags):
+            kept.add(filename)
+
+    return [(filename, url) for filename, url in files if filename in kept]
+
+
+# 完整索引目录的后缀, 与输出目录并列, 如 pypi_hf 的完整索引位于 pypi_hf_all,
+# 放在输出目录内部时会与同名的包目录冲突
+FULL_INDEX_SUFFIX = "_all"
+
+
+def get_full_index_dir(
+    output_dir: Path,
+) -> Path:
+    """
+    获取裁剪索引对应的完整索引目录
+    """
+    return output_dir.with_name(f"{output_dir.name}{FULL_INDEX_SUFFIX}")
+
+
+def remove_stale_full_indexes(
     output_dir: Path,
+    keep_full_index: bool,
 ) -> None:
     """
-    根据 PEP 503 规范构建 PyPI 简单索引
+    删除旧版本写入输出目录下 all 目录的完整索引, 未启用索引裁剪时一并删除完整索引目录
+    """
+    full_index_dir = get_full_index_dir(output_dir)
+    if not keep_full_index and full_index_dir.is_dir():
+        print(f"未启用索引裁剪, 删除完整索引目录: {full_index_dir}")
+        shutil.rmtree(full_index_dir)
+
+    # 旧版本的完整索引带有独立的页面清单, 同名包的目录没有页面清单
+    legacy_dir = output_dir / "all"
+    if (legacy_dir / MANIFEST_FILENAME).is_file():
+        print(f"删除旧版本的完整索引目录: {legacy_dir}")
+        shutil.rmtree(legacy_dir)
+
+
+class IndexOutput(TypedDict):
+    """索引输出配置"""
+
+    output_dir: Path
+    # 链接前缀替换规则 (原前缀, 镜像前缀), 为 None 时使用原始链接
+    url_prefix: tuple[str, str] | None
+
+
+def rewrite_url(
+    url: str,
+    url_prefix: tuple[str, str] | None,
+) -> str:
+    """
+    按照前缀替换规则生成镜像链接
+    """
+    if url_prefix is None:
+        return url
+    source_prefix, mirror_prefix = url_prefix
+    if url.startswith(source_prefix):
+        return mirror_prefix + url[len(source_prefix) :]
+    return url
+
+
+def build_pypi_indexes(
+    file_list: list[tuple[str, str]],
+    outputs: list[IndexOutput],
+    file_metadata: dict[str, WheelFileMetadata] | None = None,
+    metadata_hashes: dict[str, str] | None = None,
+    max_workers: int = 8,
+    keep_versions: int | None = None,
+) -> dict[Path, dict[str, int]]:
+    """
+    根据 PEP 503 规范构建 PyPI 简单索引, 并在同目录下生成 PEP 691 JSON 格式的 index.json
+
+    文件列表只分组和排序一次, 然后在一次遍历中按照各个输出的链接前缀替换规则渲染全部镜像索引,
+    页面写入由线程池并行完成
+
+    通过输出目录中的页面哈希清单进行增量构建, 只写入内容发生变化的页面,
+    并删除已经不存在的包的页面, 包的输入指纹与上一次构建一致且页面存在时跳过该包的裁剪, 渲染和页面哈希计算
 
     参数:
         file_list: 文件列表，格式为 [(文件路径, URL), ...]
-        output_dir: 输出目录路径
+        outputs: 索引输出配置列表
+        file_metadata: 文件元数据，格式为 {文件名: 元数据}, 用于链接中的 sha256 片段及 JSON 索引中的文件哈希, 大小和上传时间
+        metadata_hashes: 已在 wheel 链接旁发布的 .metadata 文件的 sha256，格式为 {文件名: sha256}, 仅为这些文件声明 PEP 658 属性
+        max_workers: 写入页面的最大线程数
+        keep_versions: 每个 (Python 标签, ABI 标签, 平台标签) 组合保留的最新版本数量, 为 None 时不裁剪;
+            裁剪后的索引写入输出目录, 完整的索引写入与输出目录并列的 <输出目录>_all 目录,
+            为 None 时删除已存在的完整索引目录
+
+    返回:
+        每个输出目录的页面变更统计, 格式为 {输出目录: {"added": int, "changed": int, "removed": int, "unchanged": int}}
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if keep_versions is not None and keep_versions < 1:
+        raise ValueError(f"keep_versions 必须为大于 0 的整数, 当前值: {keep_versions}")
+    metadata_hashes = metadata_hashes or {}
 
-    # 按包名分组文件
+    # 按包名分组文件, 只进行一次
     packages = group_files_by_package(file_list)
+    for files in packages.values():
+        files.sort(key=lambda x: x[0])
 
     print(f"找到 {len(packages)} 个包")
 
-    # 生成主索引页面
-    index_html = generate_package_index_html(packages)
-    index_file = output_dir / "index.html"
-    index_file.write_text(index_html, encoding="utf-8")
-    print(f"生成主索引页面: {index_file}")
+    for output in outputs:
+        remove_stale_full_indexes(output["output_dir"], keep_full_index=keep_versions is not None)
+
+    # 渲染目标: (输出目录, 链接前缀替换规则, 是否裁剪)
+    targets: list[tuple[Path, tuple[str, str] | None, bool]] = []
+    for output in outputs:
+        targets.append((output["output_dir"], output["url_prefix"], keep_versions is not None))
+        if keep_versions is not None:
+            targets.append((get_full_index_dir(output["output_dir"]), output["url_prefix"], False))
+
+    old_manifests: dict[Path, dict[str, str]] = {}
+    new_manifests: dict[Path, dict[str, str]] = {}
+    old_inputs: dict[Path, dict[str, str]] = {}
+    new_inputs: dict[Path, dict[str, str]] = {}
+    stats: dict[Path, dict[str, int]] = {}
+    for output_dir, _, _ in targets:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        old_manifests[output_dir] = load_index_manifest(output_dir)
+        new_manifests[output_dir] = {}
+        old_inputs[output_dir] = load_index_inputs(output_dir)
+        new_inputs[output_dir] = {}
+        stats[output_dir] = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+    # 每个目标中需要重新渲染的包
+    pending: dict[Path, list[str]] = {output_dir: [] for output_dir, _, _ in targets}
+    for package_name in sorted(packages):
+        fingerprint = get_package_fingerprint(packages[package_name], file_metadata or {}, metadata_hashes)
+        for output_dir, url_prefix, pruned in targets:
+            target_fingerprint = hashlib.sha256(
+                f"{fingerprint}|{url_prefix}|{keep_versions if pruned else None}".encode("utf-8")
+            ).hexdigest()
+            new_inputs[output_dir][package_name] = target_fingerprint
+            page_paths = (f"{package_name}/index.html", f"{package_name}/index.json")
+            if old_inputs[output_dir].get(package_name) == target_fingerprint and all(
+                relative_path in old_manifests[output_dir] and (output_dir / relative_path).is_file()
+                for relative_path in page_paths
+            ):
+                for relative_path in page_paths:
+                    new_manifests[output_dir][relative_path] = old_manifests[output_dir][relative_path]
+                stats[output_dir]["unchanged"] += len(page_paths)
+            else:
+                pending[output_dir].append(package_name)
+
+    skipped_count = sum(len(packages) - len(package_names) for package_names in pending.values())
+    if skipped_count:
+        print(f"跳过 {skipped_count} 个输入未变化的包页面")
+
+    pruned_packages: dict[str, list[tuple[str, str]]] = {}
+    if keep_versions is not None:
+        pruned_packages = {
+            package_name: prune_package_files(packages[package_name], keep_versions)
+            for package_name in sorted(
+                {
+                    package_name
+                    for output_dir, _, pruned in targets
+                    if pruned
+                    for package_name in pending[output_dir]
+                }
+            )
+        }
+        pruned_count = sum(len(packages[package_name]) - len(files) for package_name, files in pruned_packages.items())
+        print(f"按每个平台保留最新 {keep_versions} 个版本裁剪索引, 裁剪 {pruned_count} 个文件")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+
+        def _submit(output_dir: Path, relative_path: str, content: str) -> None:
+            future = executor.submit(
+                write_page_if_changed,
+                output_dir,
+                relative_path,
+                content,
+                old_manifests[output_dir],
+                new_manifests[output_dir],
+            )
+            futures.append((output_dir, relative_path, future))
+
+        # 生成主索引页面
+        index_html = generate_package_index_html(packages)
+        index_json = generate_package_index_json(packages)
+        for output_dir, _, _ in targets:
+            _submit(output_dir, "index.html", index_html)
+            _submit(output_dir, "index.json", index_json)
+
+        # 为输入发生变化的包生成详情页面
+        for output_dir, url_prefix, pruned in targets:
+            table = pruned_packages if pruned else packages
+            for package_name in pending[output_dir]:
+                mirror_files = [(filename, rewrite_url(url, url_prefix)) for filename, url in table[package_name]]
+                _submit(
+                    output_dir,
+                    f"{package_name}/index.html",
+                    generate_package_detail_html(package_name, mirror_files, metadata_hashes, file_metadata),
+                )
+                _submit(
+                    output_dir,
+                    f"{package_name}/index.json",
+                    generate_package_detail_json(package_name, mirror_files, file_metadata, metadata_hashes),
+                )
+
+        for output_dir, relative_path, future in futures:
+            result = future.result()
+            stats[output_dir][result if result is not None else "unchanged"] += 1
+            if result is not None:
+                print(f"生成页面: {output_dir / relative_path}")
+
+    for output_dir, _, _ in targets:
+        output_stats = stats[output_dir]
+        output_stats["removed"] = remove_stale_pages(output_dir, old_manifests[output_dir], new_manifests[output_dir])
+        save_index_manifest(output_dir, new_manifests[output_dir], new_inputs[output_dir])
+        print(
+            f"\nPyPI 索引生成完成, 输出目录: {output_dir}, "
+            f"新增: {output_stats['added']}, 变更: {output_stats['changed']}, "
+            f"删除: {output_stats['removed']}, 未变化: {output_stats['unchanged']}"
+        )
+
+    return stats
 
-    # 为每个包生成详情页面
-    for package_name, files in packages.items():
-        package_dir = output_dir / package_name
-        package_dir.mkdir(parents=True, exist_ok=True)
 
-        detail_html = generate_package_detail_html(package_name, files)
-        detail_file = package_dir / "index.html"
-        detail_file.write_text(detail_html, encoding="utf-8")
-        print(f"生成包详情页面: {detail_file} (包含 {len(files)} 个文件)")
+def build_pypi_index(
+    file_list: list[tuple[str, str]],
+    output_dir: Path,
+    file_metadata: dict[str, WheelFileMetadata] | None = None,
+    metadata_hashes: dict[str, str] | None = None,
+    keep_versions: int | None = None,
+) -> dict[str, int]:
+    """
+    构建单个输出目录的 PyPI 简单索引, 参数含义与 build_pypi_indexes 相同
+
+    返回:
+        页面变更统计, 格式为 {"added": int, "changed": int, "removed": int, "unchanged": int}
+    """
+    return build_pypi_indexes(
+        file_list,
+        [{"output_dir": output_dir, "url_prefix": None}],
+        file_metadata,
+        metadata_hashes,
+        keep_versions=keep_versions,
+    )[output_dir]
+
+
+def fetch_sources(
+    tasks: dict[str, Callable[[], Any]],
+    max_workers: int = 3,
+) -> dict[str, Any]:
+    """
+    使用有限大小的线程池并发获取多个来源的文件列表
+
+    每个来源的失败相互隔离, 失败的来源不会出现在返回结果中
+
+    参数:
+        tasks: 获取任务，格式为 {来源名称: 无参数的获取函数}
+        max_workers: 最大并发数
+
+    返回:
+        获取成功的来源结果，格式为 {来源名称: 获取结果}
+    """
+    results: dict[str, Any] = {}
+    timings: dict[str, float] = {}
+
+    def _timed(name: str, task: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return task()
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_timed, name, task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+                print(f"获取 {name} 文件列表完成, 耗时: {timings[name]:.2f} 秒")
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"获取 {name} 文件列表失败, 耗时: {timings.get(name, 0):.2f} 秒, 跳过该来源: {e}")
+
+    print(f"获取全部来源文件列表耗时: {time.perf_counter() - start:.2f} 秒")
+    return results
+
+
+PEP691_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+
+
+class IndexProxyState:
+    """
+    本地索引代理服务器的共享状态
+
+    索引页面在启动时渲染到内存中, wheel 链接改写为本地 /files/<文件名>,
+    wheel 文件按 sha256 和文件名缓存在磁盘上
+    """
+
+    def __init__(
+        self,
+        file_list: list[tuple[str, str]],
+        file_metadata: dict[str, WheelFileMetadata],
+        core_metadata: dict[str, str],
+        cache_dir: Path,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.files: dict[str, tuple[str, str | None]] = {}
+        self.core_metadata = {filename: metadata.encode("utf-8") for filename, metadata in core_metadata.items()}
+        self.html_pages: dict[str, bytes] = {}
+        self.json_pages: dict[str, bytes] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+        packages = group_files_by_package(file_list)
+        for files in packages.values():
+            for filename, url in files:
+                self.files[filename] = (url, file_metadata.get(filename, {}).get("sha256"))
+
+        # 元数据文件由本服务器在 <wheel 链接>.metadata 提供, 可以直接声明 PEP 658 属性
+        metadata_hashes = {
+            filename: hashlib.sha256(metadata).hexdigest() for filename, metadata in self.core_metadata.items()
+        }
+        self.html_pages["/simple/"] = generate_package_index_html(packages).encode("utf-8")
+        self.json_pages["/simple/"] = generate_package_index_json(packages).encode("utf-8")
+        for package_name, files in packages.items():
+            local_files = [(filename, f"/files/{quote(filename)}") for filename, _ in files]
+            self.html_pages[f"/simple/{package_name}/"] = generate_package_detail_html(
+                package_name, local_files, metadata_hashes, file_metadata
+            ).encode("utf-8")
+            self.json_pages[f"/simple/{package_name}/"] = generate_package_detail_json(
+                package_name, local_files, file_metadata, metadata_hashes
+            ).encode("utf-8")
+
+        print(f"索引代理服务器已加载 {len(packages)} 个包, {len(self.files)} 个 wheel")
+
+    def get_cache_file(
+        self,
+        filename: str,
+    ) -> Path:
+        """
+        获取 wheel 的缓存路径, 按 sha256 和文件名区分
+        """
+        _, sha256 = self.files[filename]
+        return self.cache_dir / (sha256 or "unknown") / filename
+
+    def get_lock(
+        self,
+        filename: str,
+    ) -> threading.Lock:
+        """
+        获取 wheel 的缓存写入锁
+        """
+        with self._locks_lock:
+            return self._locks.setdefault(filename, threading.Lock())
+
+
+def parse_range_header(
+    value: str | None,
+    size: int,
+) -> tuple[int, int] | None:
+    """
+    解析单个范围的 Range 请求头
+    返回: (起始位置, 结束位置), 不存在或无法解析时返回 None
+    """
+    if not value or not value.startswith("bytes=") or "," in value:
+        return None
+
+    start_text, _, end_text = value[len("bytes=") :].strip().partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    return start, min(end, size - 1)
+
+
+class IndexProxyHandler(BaseHTTPRequestHandler):
+    """本地索引代理服务器请求处理器"""
+
+    state: IndexProxyState
+    chunk_size = 1024 * 1024
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+
+        if path in ("/", "/simple"):
+            path = "/simple/"
+        if path.startswith("/simple/"):
+            self._send_index_page(path, parts.query)
+        elif path.startswith("/files/"):
+            self._send_file(path[len("/files/") :])
+        else:
+            self.send_error(404)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        # 与 GET 请求使用相同的处理流程, 只发送响应头
+        self.do_GET()
+
+    def _write_body(
+        self,
+        content: bytes,
+    ) -> None:
+        if self.command != "HEAD":
+            self.wfile.write(content)
 
-    print(f"\nPyPI 索引生成完成, 输出目录: {output_dir}")
+    def _send_index_page(
+        self,
+        path: str,
+        query: str,
+    ) -> None:
+        want_json = "format=json" in query or PEP691_CONTENT_TYPE in self.headers.get("Accept", "")
+        if path.endswith("/index.json"):
+            path, want_json = path[: -len("index.json")], True
+        elif path.endswith("/index.html"):
+            path = path[: -len("index.html")]
+        if not path.endswith("/"):
+            path += "/"
+
+        pages = self.state.json_pages if want_json else self.state.html_pages
+        if path not in pages:
+            self.send_error(404)
+            return
+
+        content = pages[path]
+        self.send_response(200)
+        self.send_header("Content-Type", PEP691_CONTENT_TYPE if want_json else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Vary", "Accept")
+        self.end_headers()
+        self._write_body(content)
+
+    def _send_file(
+        self,
+        filename: str,
+    ) -> None:
+        if filename.endswith(".metadata") and filename[: -len(".metadata")] in self.state.core_metadata:
+            content = self.state.core_metadata[filename[: -len(".metadata")]]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self._write_body(content)
+            return
+
+        if filename not in self.state.files:
+            self.send_error(404)
+            return
+
+        cache_file = self.state.get_cache_file(filename)
+        if cache_file.is_file():
+            self._send_cached_file(cache_file)
+            return
+
+        # HEAD 请求, 范围请求或其他请求正在缓存该文件时直接转发上游, 不写入缓存
+        lock = self.state.get_lock(filename)
+        if self.command == "HEAD" or self.headers.get("Range") or not lock.acquire(blocking=False):
+            self._proxy_upstream(filename)
+            return
+
+        try:
+            if cache_file.is_file():
+                self._send_cached_file(cache_file)
+            else:
+                self._stream_and_cache(filename, cache_file)
+        finally:
+            lock.release()
+
+    def _send_cached_file(
+        self,
+        cache_file: Path,
+    ) -> None:
+        size = cache_file.stat().st_size
+        byte_range = parse_range_header(self.headers.get("Range"), size)
+        if byte_range is not None and byte_range[0] > byte_range[1]:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return
+
+        start, end = byte_range if byte_range is not None else (0, size - 1)
+        self.send_response(206 if byte_range is not None else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if byte_range is not None:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        with open(cache_file, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _proxy_upstream(
+        self,
+        filename: str,
+    ) -> None:
+        url, _ = self.state.files[filename]
+        headers = {"Range": self.headers["Range"]} if self.headers.get("Range") else {}
+        headers_sent = False
+        try:
+            # 使用与客户端相同的请求方法, HEAD 请求不下载文件内容
+            with requests.request(self.command, url, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code >= 400:
+                    # 状态行只能使用 latin-1 字符, 中文说明放在响应正文中
+                    self.send_error(502, "Bad Gateway", f"上游返回状态码 {response.status_code}")
+                    return
+
+                self.send_response(response.status_code)
+                for header in ("Content-Type", "Content-Length", "Content-Range", "Accept-Ranges"):
+                    if header in response.headers:
+                        self.send_header(header, response.headers[header])
+                self.end_headers()
+                headers_sent = True
+                for chunk in response.iter_content(self.chunk_size):
+                    self.wfile.write(chunk)
+        except requests.RequestException as e:
+            print(f"从上游获取 {filename} 失败: {e}")
+            if not headers_sent:
+                self.send_error(502, "Bad Gateway", f"请求上游失败: {e}")
+
+    def _stream_and_cache(
+        self,
+        filename: str,
+        cache_file: Path,
+    ) -> None:
+        url, sha256 = self.state.files[filename]
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        part_file = cache_file.with_name(f"{cache_file.name}.part")
+        hasher = hashlib.sha256()
+        headers_sent = False
+        client_connected = True
+
+        print(f"从上游下载并缓存 {filename}")
+        try:
+            with requests.get(url, stream=True, timeout=30) as response:
+                if response.status_code != 200:
+                    self.send_error(502, "Bad Gateway", f"上游返回状态码 {response.status_code}")
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                if "Content-Length" in response.headers:
+                    self.send_header("Content-Length", response.headers["Content-Length"])
+                self.end_headers()
+                headers_sent = True
+
+                # 客户端断开后继续下载, 保证文件完整写入缓存
+                with open(part_file, "wb") as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        if client_connected:
+                            try:
+                                self.wfile.write(chunk)
+                            except (BrokenPipeError, ConnectionResetError):
+                                client_connected = False
+
+            if sha256 and hasher.hexdigest() != sha256:
+                print(f"{filename} 的 sha256 校验失败, 丢弃缓存")
+                return
+
+            os.replace(part_file, cache_file)
+            print(f"缓存 {filename} 完成")
+        except requests.RequestException as e:
+            print(f"从上游下载 {filename} 失败, 丢弃缓存: {e}")
+            if not headers_sent:
+                self.send_error(502, "Bad Gateway", f"请求上游失败: {e}")
+        finally:
+            # 下载失败或校验失败时删除未完成的缓存文件
+            part_file.unlink(missing_ok=True)
+
+
+def serve_main(
+    argv: list[str],
+) -> None:
+    """
+    本地缓存索引代理服务器入口
+
+    用法: python build_pypi.py serve [--source huggingface] [--port 8000]
+    """
+    parser = argparse.ArgumentParser(prog="build_pypi.py serve", description="本地缓存 PyPI 索引代理服务器")
+    parser.add_argument(
+        "--source",
+        choices=("github", "huggingface", "modelscope"),
+        default="huggingface",
+        help="wheel 来源, 默认为 huggingface",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址, 默认为 0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口, 默认为 8000")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path.home() / ".cache" / "hub-action" / "wheels",
+        help="wheel 缓存目录",
+    )
+    parser.add_argument(
+        "--mirror",
+        default=None,
+        help="上游链接前缀替换规则, 格式为 <原前缀>=<镜像前缀>, 如 https://huggingface.co/=https://hf-mirror.com/",
+    )
+    parser.add_argument(
+        "--core-metadata",
+        action="store_true",
+        help="提取 wheel 的 METADATA 并提供 PEP 658 元数据文件",
+    )
+    args = parser.parse_args(argv)
+
+    if args.source == "github":
+        file_list = get_github_release_file(repo="licyk/term-sd", tag="wheel")
+        file_metadata = get_github_release_file_metadata(repo="licyk/term-sd", tag="wheel")
+    elif args.source == "huggingface":
+        file_list, file_metadata = get_huggingface_repo_file_with_metadata(repo_id="licyk/wheel", repo_type="model")
+    else:
+        file_list, file_metadata = get_modelscope_repo_file_with_metadata(repo_id="licyks/wheels", repo_type="model")
+    file_list = filter_whl_file(file_list)
+
+    if args.mirror:
+        source_prefix, _, mirror_prefix = args.mirror.partition("=")
+        file_list = [(file, rewrite_url(url, (source_prefix, mirror_prefix))) for file, url in file_list]
+
+    cache_dir = args.cache_dir.absolute()
+    core_metadata: dict[str, str] = {}
+    if args.core_metadata:
+        core_metadata = collect_core_metadata(file_list, file_metadata, cache_dir / "metadata")
+
+    IndexProxyHandler.state = IndexProxyState(file_list, file_metadata, core_metadata, cache_dir)
+    server = ThreadingHTTPServer((args.host, args.port), IndexProxyHandler)
+    print(f"索引代理服务器已启动: http://{args.host}:{args.port}/simple/, 缓存目录: {cache_dir}")
+    print(f"使用方法: pip install <包名> --index-url http://<服务器地址>:{args.port}/simple/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("索引代理服务器已停止")
+    finally:
+        server.server_close()
 
 
 def main() -> None:
     root_path = Path(os.getenv("root_path", os.getcwd())).absolute()
     print(f"根目录: {root_path}")
+    keep_versions = int(os.environ["keep_versions"]) if os.getenv("keep_versions") else None
+    if keep_versions is not None and keep_versions < 1:
+        raise ValueError(f"keep_versions 必须为大于 0 的整数, 当前值: {keep_versions}")
+
+    sources = fetch_sources(
+        {
+            "GitHub": lambda: (
+                get_github_release_file(repo="licyk/term-sd", tag="wheel"),
+                get_github_release_file_metadata(repo="licyk/term-sd", tag="wheel"),
+            ),
+            "HuggingFace": lambda: get_huggingface_repo_file_with_metadata(repo_id="licyk/wheel", repo_type="model"),
+            "ModelScope": lambda: get_modelscope_repo_file_with_metadata(repo_id="licyks/wheels", repo_type="model"),
+        }
+    )
+    if not sources:
+        raise RuntimeError("所有来源的文件列表均获取失败")
+
+    metadata_cache_path = Path(
+        os.getenv("metadata_cache_path", root_path / ".wheel_metadata_cache")
+    ).absolute()
+    hf_token = os.getenv("HF_TOKEN")
+    ms_token = os.getenv("MODELSCOPE_API_TOKEN")
+    repo_manager = RepoManager(hf_token=hf_token, ms_token=ms_token)
 
-    gh_file = get_github_release_file(repo="licyk/term-sd", tag="wheel")
-    hf_file = get_huggingface_repo_file(repo_id="licyk/wheel", repo_type="model")
-    ms_file = get_modelscope_repo_file(repo_id="licyks/wheels", repo_type="model")
-    gh_file = filter_whl_file(gh_file)
-    hf_file = filter_whl_file(hf_file)
-    ms_file = filter_whl_file(ms_file)
-
-    def _hf_mirror_list(file_list: list[tuple[str, str]]) -> list[tuple[str, str]]:
-        hf_mirror_list: list[tuple[str, str]] = []
-        for file, url in file_list:
-            hf_mirror_list.append(
-                (file, url.replace("https://huggingface.co/", "https://hf-mirror.com/"))
+    # 获取失败的来源不生成索引, 保留上一次构建的结果
+    if "GitHub" in sources:
+        gh_file, gh_metadata = sources["GitHub"]
+        gh_file = filter_whl_file(gh_file)
+        build_pypi_index(gh_file, root_path / "pypi_gh", gh_metadata, keep_versions=keep_versions)
+
+    if "HuggingFace" in sources:
+        hf_file, hf_metadata = sources["HuggingFace"]
+        hf_metadata_hashes = collect_published_metadata_hashes(hf_file, hf_metadata, metadata_cache_path)
+        if hf_token:
+            hf_metadata_hashes.update(
+                upload_core_metadata_files(
+                    hf_file, hf_metadata, metadata_cache_path, repo_manager, "huggingface", "licyk/wheel", "model"
+                )
             )
+        hf_file = filter_whl_file(hf_file)
+        build_pypi_indexes(
+            hf_file,
+            [
+                {"output_dir": root_path / "pypi_hf", "url_prefix": None},
+                {
+                    "output_dir": root_path / "pypi_hf_mirror",
+                    "url_prefix": ("https://huggingface.co/", "https://hf-mirror.com/"),
+                },
+            ],
+            hf_metadata,
+            hf_metadata_hashes,
+            keep_versions=keep_versions,
+        )
+
+    if "ModelScope" in sources:
+        ms_file, ms_metadata = sources["ModelScope"]
+        ms_metadata_hashes = collect_published_metadata_hashes(ms_file, ms_metadata, metadata_cache_path)
+        if ms_token:
+            ms_metadata_hashes.update(
+                upload_core_metadata_files(
+                    ms_file, ms_metadata, metadata_cache_path, repo_manager, "modelscope", "licyks/wheels", "model"
+                )
+            )
+        ms_file = filter_whl_file(ms_file)
+        build_pypi_index(
+            ms_file,
+            root_path / "pypi",
+            ms_metadata,
+            ms_metadata_hashes,
+            keep_versions=keep_versions,
+        )
 
-        return hf_mirror_list
+    for output_dir in ("pypi_gh", "pypi_hf", "pypi_hf_mirror", "pypi"):
+        for index_dir in (root_path / output_dir, get_full_index_dir(root_path / output_dir)):
+            if index_dir.is_dir():
+                precompress_directory(index_dir, (".html", ".json"))
 
-    hf_mirror_file = _hf_mirror_list(hf_file)
+    prune_github_cache(get_github_cache_dir())
 
-    print("获取文件列表完成, 生成包索引中")
-    build_pypi_index(gh_file, root_path / "pypi_gh")
-    build_pypi_index(hf_file, root_path / "pypi_hf")
-    build_pypi_index(ms_file, root_path / "pypi")
-    build_pypi_index(hf_mirror_file, root_path / "pypi_hf_mirror")
+    failed_sources = [name for name in ("GitHub", "HuggingFace", "ModelScope") if name not in sources]
+    if failed_sources:
+        print(f"以下来源获取失败, 未更新对应的索引: {', '.join(failed_sources)}")
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve_main(sys.argv[2:])
+    else:
+        main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from functools import wraps
 from typing import (
@@ -13,6 +14,14 @@ import requests
 from sd_webui_all_in_one.retry_decorator import retryable
 from sd_webui_all_in_one.repo_manager import RepoManager
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from github_release import (  # noqa: E402
+    get_github_cache_dir,
+    get_github_release_by_tag,
+    prune_github_cache,
+)
+
 
 @retryable(
     times=3,
@@ -21,27 +30,18 @@ from sd_webui_all_in_one.repo_manager import RepoManager
     catch_exceptions=(requests.RequestException, ValueError),
     raise_exception=RuntimeError,
 )
-def get_github_release_file(repo: str, tag: str) -> list[tuple[str, str]]:
-    url = f"https://api.github.com/repos/{repo}/releases"
-    data = {
-        "Accept": "application/vnd.github+json",
-    }
-    file_list = []
-
+def get_github_release_file(
+    repo: str,
+    tag: str,
+    cache_dir: Path | None = None,
+) -> list[tuple[str, str]]:
     print(f"获取 {repo} 的文件列表")
-    response = requests.get(url=url, data=data, timeout=30)
-    res = response.json()
-    if response.status_code < 200 or response.status_code > 300:
-        error_msg = f"获取 {repo} 的文件列表失败，状态码: {response.status_code}"
-        print(error_msg)
-        raise RuntimeError(error_msg)
-
-    for i in res:
-        if i.get("tag_name") == tag:
-            for x in i.get("assets"):
-                file_list.append((x.get("name"), x.get("browser_download_url")))
+    release = get_github_release_by_tag(repo, tag, cache_dir or get_github_cache_dir())
+    if release is None:
+        print(f"{repo} 中未找到标签为 {tag} 的 Release")
+        return []
 
-    return file_list
+    return [(x.get("name"), x.get("browser_download_url")) for x in release.get("assets", [])]
 
 
 @retryable(
@@ -169,6 +169,7 @@ def main() -> None:
     write_content_to_file(pypi_hf_html, root_path / "index_hf.html")
     write_content_to_file(pypi_hf_mirror_html, root_path / "index_hf_mirror.html")
     write_content_to_file(pypi_ms_html, root_path / "index.html")
+    prune_github_cache(get_github_cache_dir())
 
 
 if __name__ == "__main__":
@@ -7,12 +7,25 @@
 - HF_REPO_TYPE: HuggingFace 仓库类型
 - MS_REPO_ID: ModelScope 仓库 ID
 - MS_REPO_TYPE: ModelScope 仓库类型
+- HF_REPO_LIST: 额外的 HuggingFace 仓库列表, 格式为 "repo_id:repo_type", 每行一个
+- MS_REPO_LIST: 额外的 ModelScope 仓库列表, 格式为 "repo_id:repo_type", 每行一个
+- CLEAN_CONCURRENCY: 同时清理的仓库数量
+- HF_DELETE_BATCH_SIZE: HuggingFace 每个删除提交包含的文件数量
 - DAY_THRESHOLD: 整合包过期时间 (天)
+- KEEP_NIGHTLY: 每个 (软件名, 署名) 分组保留最新的 nightly 整合包数量
+- KEEP_STABLE: 每个 (软件名, 署名) 分组保留最新的 stable 整合包数量
+- SIZE_BUDGET: 整合包总大小上限, 如 500G, 超出时先从最旧的 nightly 整合包开始删除, 再从版本最旧的 stable 整合包开始删除
+- RETENTION_PLAN_PATH: 保存保留计划 Json 文件的目录
+- DRY_RUN: 只生成保留计划, 不删除文件
+- MS_CLONE_MODE: ModelScope 仓库克隆模式 (full/sparse), sparse 模式只获取目录树并在索引中删除文件
+- MS_DELETE_BACKEND: ModelScope 文件删除方式 (api/git), api 方式通过提交接口批量删除, 失败时回退到 git
+- MS_DELETE_BATCH_SIZE: 使用 api 删除方式时每次提交包含的文件数量
 """
 import os
 import re
 import time
 import datetime
+import json
 import logging
 import shlex
 import shutil
@@ -20,7 +33,9 @@ import stat
 import subprocess
 import sys
 import tempfile
+import threading
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Any,
     Literal,
@@ -28,13 +43,21 @@ from typing import (
     TypeVar,
     ParamSpec,
     TypeAlias,
+    TypedDict,
+    NotRequired,
     cast,
 )
 from pathlib import Path
-from collections import namedtuple
+from collections import deque, namedtuple
 
 from huggingface_hub import HfApi, CommitOperationDelete
+from huggingface_hub.hf_api import RepoFile
 from modelscope import HubApi
+from modelscope.hub.errors import raise_on_error
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ms_repo_tree import list_modelscope_dataset_files  # noqa: E402
 
 
 logger = logging.getLogger(__name__)
@@ -163,6 +186,29 @@ def get_modelscope_git_token(token: str) -> str:
     return git_token
 
 
+OAUTH_URL_PATTERN = r"oauth2:[^@\s]+@"
+
+
+def build_redactor(
+    sensitive_values: list[str] | tuple[str, ...] | None = None,
+) -> Callable[[str], str]:
+    """根据全部敏感内容构建单次扫描的脱敏函数
+
+    敏感内容按长度从长到短合并为一个正则表达式, 与带认证信息的 URL 规则一起在一次扫描中完成替换
+
+    :param sensitive_values`(list[str] | tuple[str, ...] | None)`: 需要脱敏的敏感内容
+    :return `Callable[[str], str]`: 脱敏函数
+    """
+    values = sorted({value for value in sensitive_values or [] if value}, key=len, reverse=True)
+    alternatives = [f"(?P<oauth>{OAUTH_URL_PATTERN})", *(re.escape(value) for value in values)]
+    pattern = re.compile("|".join(alternatives))
+
+    def _replace(match: re.Match[str]) -> str:
+        return "oauth2:***@" if match.group("oauth") is not None else "***"
+
+    return lambda text: pattern.sub(_replace, text)
+
+
 def redact_sensitive_text(
     text: str | None,
     sensitive_values: list[str] | tuple[str, ...] | None = None,
@@ -171,15 +217,31 @@ def redact_sensitive_text(
     if text is None:
         return None
 
-    redacted = text
-    for value in sorted(
-        [value for value in sensitive_values or [] if value],
-        key=len,
-        reverse=True,
-    ):
-        redacted = redacted.replace(value, "***")
+    return build_redactor(sensitive_values)(text)
+
+
+class CommandRecord(TypedDict):
+    command: str
+    returncode: int
+    seconds: float
 
-    return re.sub(r"oauth2:[^@\s]+@", "oauth2:***@", redacted)
+
+# 全部已执行命令的耗时和退出状态, 多个仓库并发清理时共享
+COMMAND_RECORDS: list[CommandRecord] = []
+_command_records_lock = threading.Lock()
+
+
+def print_command_summary() -> None:
+    """打印全部已执行命令的耗时和退出状态"""
+    with _command_records_lock:
+        records = list(COMMAND_RECORDS)
+    if not records:
+        return
+
+    print("命令执行统计:")
+    for record in records:
+        print(f"- [{record['returncode']}] {record['seconds']:.2f} 秒: {record['command']}")
+    print(f"命令数量: {len(records)}, 总耗时: {sum(record['seconds'] for record in records):.2f} 秒")
 
 
 def preprocess_command(
@@ -219,9 +281,13 @@ def run_cmd(
     cwd: Path | None = None,
     check: bool | None = True,
     sensitive_values: list[str] | tuple[str, ...] | None = None,
+    tail_lines: int = 50,
 ) -> str | None:
     """执行 Shell 命令
 
+    实时输出时逐行读取标准输出和错误输出, 脱敏后立即打印, 只保留最后 `tail_lines` 行用于错误报告,
+    每个命令的耗时和退出状态记录到 `COMMAND_RECORDS` 中
+
     Args:
         command (str | list[str]): 要执行的命令
         custom_env (dict[str, str] | None): 自定义环境变量
@@ -230,6 +296,7 @@ def run_cmd(
         cwd (Path | None): 执行进程时的起始路径
         check (bool | None): 是否检查进程退出状态
         sensitive_values (list[str] | tuple[str, ...] | None): 需要从输出中脱敏的敏感内容
+        tail_lines (int): 错误报告中保留的输出行数
     Returns:
         str | None: 命令输出内容, 当 live=True 或执行失败时可能返回 None
     Raises:
@@ -243,6 +310,8 @@ def run_cmd(
         custom_env = os.environ.copy()
 
     command_to_exec = preprocess_command(command=command, shell=shell)
+    redact = build_redactor(sensitive_values)
+    display_command = redact(command if isinstance(command, str) else shlex.join(command))
 
     kwargs: dict[str, Any] = {
         "args": command_to_exec,
@@ -253,26 +322,52 @@ def run_cmd(
         "errors": "ignore",
     }
 
-    if not live or sensitive_values:
-        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    start = time.perf_counter()
+    output: str | None = None
+    if live:
+        tail: deque[str] = deque(maxlen=tail_lines)
+        with subprocess.Popen(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs) as process:
+            assert process.stdout is not None
+            for line in process.stdout:
+                line = redact(line.rstrip("\n"))
+                print(line, flush=True)
+                tail.append(line)
+        returncode = process.returncode
+        error_output = "\n".join(tail)
+    else:
+        result: subprocess.CompletedProcess[str] = subprocess.run(  # pylint: disable=subprocess-run-check
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+        returncode = result.returncode
+        output = redact(result.stdout) if result.stdout is not None else None
+        error_output = "\n".join(
+            [
+                *(output or "").splitlines(),
+                *redact(result.stderr or "").splitlines(),
+            ][-tail_lines:]
+        )
 
-    result: subprocess.CompletedProcess[str] = subprocess.run(**kwargs)  # pylint: disable=subprocess-run-check
+    seconds = time.perf_counter() - start
+    with _command_records_lock:
+        COMMAND_RECORDS.append({
+            "command": display_command,
+            "returncode": returncode,
+            "seconds": round(seconds, 2),
+        })
 
-    if check and result.returncode != 0:
+    if check and returncode != 0:
         errors = [
-            f"执行命令时发生错误, 错误代码: {result.returncode}",
+            f"执行命令时发生错误, 错误代码: {returncode}, 耗时: {seconds:.2f} 秒",
+            f"命令: {display_command}",
         ]
-        if result.stdout:
-            stdout = redact_sensitive_text(result.stdout, sensitive_values)
-            errors.append(f"标准输出: {stdout}")
-        if result.stderr:
-            stderr = redact_sensitive_text(result.stderr, sensitive_values)
-            errors.append(f"错误输出: {stderr}")
+        if error_output:
+            errors.append(f"输出 (最后 {tail_lines} 行): {error_output}")
 
         raise RuntimeError("\n".join(errors))
 
-    return redact_sensitive_text(result.stdout, sensitive_values)
-
+    return output
 
 
 def remove_files(
@@ -573,8 +668,19 @@ def get_env_repo_type(env_name: str) -> RepoType:
     return cast(RepoType, repo_type)
 
 
+# ModelScope 仓库克隆模式
+# - full: 完整克隆并检出全部文件 (跳过 LFS 文件下载)
+# - sparse: 使用 --filter=blob:none --no-checkout --depth=1 克隆, 只在索引中删除文件, 不检出工作区
+MSCloneMode: TypeAlias = Literal["full", "sparse"]
+MS_CLONE_MODES = ("full", "sparse")
+
+
 class ModelScopeGitRepo:
-    """通过 git 操作 ModelScope 仓库的上下文管理器"""
+    """通过 git 操作 ModelScope 仓库的上下文管理器
+
+    `clone_mode="sparse"` 时只获取最新提交的目录树, 不下载文件内容也不检出工作区,
+    删除操作直接作用于索引, 克隆和提交耗时不随仓库大小增长, 该模式下只支持 `add` 和 `delete`
+    """
 
     def __init__(
         self,
@@ -582,10 +688,15 @@ class ModelScopeGitRepo:
         repo_type: MSRepoType,
         token: str,
         repo_path: str | Path | None = None,
+        clone_mode: MSCloneMode = "full",
     ) -> None:
+        if clone_mode not in MS_CLONE_MODES:
+            raise ValueError(f"clone_mode 必须是以下值之一: {', '.join(MS_CLONE_MODES)}")
+
         self.repo_id = repo_id
         self.repo_type = repo_type
         self.token = token
+        self.clone_mode = clone_mode
         self.repo_path = Path(repo_path).expanduser() if repo_path is not None else None
         self._temp_dir: tempfile.TemporaryDirectory | None = None
         self._git_token: str | None = None
@@ -604,14 +715,21 @@ class ModelScopeGitRepo:
             clone_env = os.environ.copy()
             clone_env["GIT_LFS_SKIP_SMUDGE"] = "1"
 
-            print(f"克隆 ModelScope 仓库 {self.repo_id} (类型: {self.repo_type})")
+            clone_args = ["git", "clone", "--progress"]
+            if self.clone_mode == "sparse":
+                clone_args += ["--filter=blob:none", "--no-checkout", "--depth=1"]
+
+            print(f"克隆 ModelScope 仓库 {self.repo_id} (类型: {self.repo_type}, 模式: {self.clone_mode})")
             run_cmd(
-                ["git", "clone", self._repo_url, str(repo_path)],
+                [*clone_args, self._repo_url, str(repo_path)],
                 custom_env=clone_env,
-                live=False,
+                live=True,
                 shell=False,
                 sensitive_values=self._sensitive_values(),
             )
+            if self.clone_mode == "sparse":
+                # 只从目录树构建索引, 不需要文件内容
+                self._git(["read-tree", "HEAD"])
             self._git(["lfs", "install", "--local"])
             self._configure_lfs_locksverify()
             self._ensure_git_identity()
@@ -643,6 +761,8 @@ class ModelScopeGitRepo:
             dst_path = self._resolve_repo_path(dst)
 
         copy_files(src_path, dst_path)
+        if self.clone_mode == "sparse":
+            self._git(["add", "--", str(dst_path.relative_to(self._require_repo_path().resolve()))])
 
     def delete(
         self,
@@ -650,6 +770,15 @@ class ModelScopeGitRepo:
     ) -> None:
         """删除仓库内文件或目录"""
         target_path = self._resolve_repo_path(path)
+        if self.clone_mode == "sparse":
+            relative_path = target_path.relative_to(self._require_repo_path().resolve()).as_posix()
+            tracked = self._git(["ls-files", "--", relative_path], live=False)
+            if not tracked or not tracked.strip():
+                print(f"仓库路径不存在, 跳过删除: {Path(path).as_posix()}")
+                return
+            self._git(["rm", "-r", "--cached", "--quiet", "--", relative_path])
+            return
+
         if not _path_exists(target_path):
             print(f"仓库路径不存在, 跳过删除: {Path(path).as_posix()}")
             return
@@ -662,6 +791,7 @@ class ModelScopeGitRepo:
         dst: str | Path,
     ) -> None:
         """复制仓库内文件或目录"""
+        self._require_checkout("copy")
         copy_files(
             self._resolve_repo_path(src),
             self._resolve_repo_path(dst),
@@ -673,6 +803,7 @@ class ModelScopeGitRepo:
         dst: str | Path,
     ) -> None:
         """移动仓库内文件或目录"""
+        self._require_checkout("move")
         move_files(
             self._resolve_repo_path(src),
             self._resolve_repo_path(dst),
@@ -683,16 +814,20 @@ class ModelScopeGitRepo:
         message: str = "Clean outdated sd portable",
     ) -> bool:
         """提交并推送仓库变更, 无变更时返回 False"""
-        self._git(["add", "-A"])
-        status = self._git(["status", "--porcelain"], live=False)
+        if self.clone_mode == "sparse":
+            # 工作区未检出, 不能使用 git add -A, 只提交索引中的变更
+            status = self._git(["diff", "--cached", "--name-only"], live=False)
+        else:
+            self._git(["add", "-A"])
+            status = self._git(["status", "--porcelain"], live=False)
         if not status or not status.strip():
             print("ModelScope 仓库没有需要提交的变更")
             return False
 
         self._git(["commit", "-m", message])
         self._git(
-            ["push", "origin", "HEAD"],
-            live=False,
+            ["push", "--progress", "origin", "HEAD"],
+            live=True,
             sensitive_values=self._sensitive_values(),
         )
         return True
@@ -711,6 +846,10 @@ class ModelScopeGitRepo:
         else:
             self.repo_path.mkdir(parents=True, exist_ok=True)
 
+    def _require_checkout(self, operation: str) -> None:
+        if self.clone_mode == "sparse":
+            raise RuntimeError(f"稀疏克隆模式下不支持 {operation} 操作, 请使用 full 模式")
+
     def _require_repo_path(self) -> Path:
         if self.repo_path is None:
             raise RuntimeError("ModelScope Git 仓库尚未初始化")
@@ -795,101 +934,51 @@ class ModelScopeGitRepo:
         self.repo_path = None
 
 
-def get_repo_file(
-    api: HfApi | HubApi,
-    repo_id: str,
-    repo_type: HFRepoType = "model",
-) -> list[str]:
-    """获取 HuggingFace / ModelScope 仓库文件列表
-
-    :param api`(HfApi|HubApi)`: HuggingFace / ModelScope Api 实例
-    :param repo_id`(str)`: HuggingFace / ModelScope 仓库 ID
-    :param repo_type`(str)`: HuggingFace / ModelScope 仓库类型
-    :return `list[str]`: 仓库文件列表
-    """
-    if isinstance(api, HfApi):
-        print(f"获取 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 的文件列表")
-        return get_hf_repo_files(api, repo_id, repo_type)
-    if isinstance(api, HubApi):
-        print(f"获取 ModelScope 仓库 {repo_id} (类型: {repo_type}) 的文件列表")
-        return get_ms_repo_files(api, repo_id, repo_type)
-
-    print(f"未知 Api 类型: {api}")
-    return []
-
-
 @retryable(
     times=3,
     delay=1.0,
-    describe="获取 HuggingFace 仓库文件列表",
+    describe="获取仓库文件大小",
     catch_exceptions=Exception,
     raise_exception=RuntimeError,
 )
-def get_hf_repo_files(
-    api: HfApi,
-    repo_id: str,
-    repo_type: HFRepoType,
-) -> list[str]:
-    """获取 HuggingFace 仓库文件列表
-
-    :param api`(HfApi)`: HuggingFace Api 实例
-    :param repo_id`(str)`: HuggingFace 仓库 ID
-    :param repo_type`(str)`: HuggingFace 仓库类型
-    :return `list[str]`: 仓库文件列表
-    """
-    return api.list_repo_files(
-        repo_id=repo_id,
-        repo_type=repo_type,
-    )
-
-
-@retryable(
-    times=3,
-    delay=1.0,
-    describe="获取 ModelScope 仓库文件列表",
-    catch_exceptions=Exception,
-    raise_exception=RuntimeError,
-)
-def get_ms_repo_files(
-    api: HubApi,
+def get_repo_file_sizes(
+    api: HfApi | HubApi,
     repo_id: str,
-    repo_type: MSRepoType = "model",
-) -> list[str]:
-    """ 获取 ModelScope 仓库文件列表
+    repo_type: RepoType = "model",
+) -> dict[str, int]:
+    """获取 HuggingFace / ModelScope 仓库文件列表和文件大小
 
-    :param api`(HfApi)`: ModelScope Api 实例
-    :param repo_id`(str)`: ModelScope 仓库 ID
-    :param repo_type`(str)`: ModelScope 仓库类型
-    :return `list[str]`: 仓库文件列表
+    :param api`(HfApi|HubApi)`: HuggingFace / ModelScope Api 实例
+    :param repo_id`(str)`: HuggingFace / ModelScope 仓库 ID
+    :param repo_type`(str)`: HuggingFace / ModelScope 仓库类型
+    :return `dict[str, int]`: 仓库文件路径和文件大小 (字节)
     """
-    file_list = []
-
-    def _get_file_path(repo_files: list) -> list[str]:
-        """获取 ModelScope Api 返回的仓库列表中的模型路径"""
-        return [
-            file["Path"]
-            for file in repo_files
-            if file['Type'] != 'tree'
-        ]
+    if isinstance(api, HfApi):
+        print(f"获取 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 的文件列表和文件大小")
+        return {
+            item.path: item.size or 0
+            for item in api.list_repo_tree(
+                repo_id=repo_id,
+                repo_type=repo_type,
+                recursive=True,
+            )
+            if isinstance(item, RepoFile)
+        }
 
+    print(f"获取 ModelScope 仓库 {repo_id} (类型: {repo_type}) 的文件列表和文件大小")
     if repo_type == "model":
-        repo_files = api.get_model_files(
-            model_id=repo_id,
-            recursive=True
-        )
-        file_list = _get_file_path(repo_files)
+        repo_files = api.get_model_files(model_id=repo_id, recursive=True)
     elif repo_type == "dataset":
-        repo_files = api.get_dataset_files(
-            repo_id=repo_id,
-            recursive=True
-        )
-        file_list = _get_file_path(repo_files)
-    elif repo_type == "space":
-        print(f"{repo_id} 仓库类型为创空间, 不支持获取文件列表")
+        repo_files = list_modelscope_dataset_files(api, repo_id)
     else:
-        raise ValueError(f"未知的 {repo_type} 仓库类型")
+        print(f"{repo_id} 仓库类型为 {repo_type}, 不支持获取文件列表")
+        return {}
 
-    return file_list
+    return {
+        file["Path"]: int(file.get("Size") or 0)
+        for file in repo_files
+        if file["Type"] != "tree"
+    }
 
 
 def fitter_portable_list(repo_files: list[str]) -> tuple[list[str], list[str]]:
@@ -913,34 +1002,222 @@ def fitter_portable_list(repo_files: list[str]) -> tuple[list[str], list[str]]:
     return stable, nightly
 
 
-def is_outdated_portable(name: str, day_threshold: int) -> bool:
-    """判断整合包是否过期
+class RetentionPolicy(TypedDict):
+    """整合包保留规则, 规则为 None 时不启用, 按 (软件名, 署名) 分组应用"""
+
+    keep_nightly: int | None  # 每组保留最新的 N 个 nightly 整合包
+    keep_stable: int | None  # 每组保留最新的 M 个 stable 整合包
+    max_age_days: int | None  # 删除构建日期超过该天数的 nightly 整合包
+    byte_budget: int | None  # 整合包总大小上限 (字节), 超出时先删除 nightly 整合包, 再删除 stable 整合包
+
+
+class RetentionDecision(TypedDict):
+    path: str
+    group: str
+    build_type: str
+    size: int
+    action: Literal["keep", "delete"]
+    reason: str
+
+
+class RetentionPlan(TypedDict):
+    keep: list[RetentionDecision]
+    delete: list[RetentionDecision]
+    kept_bytes: int
+    reclaimed_bytes: int
+
+
+def parse_size(value: str) -> int:
+    """解析带单位的大小, 单位以 1024 为进制, 如 `500G`, `1.5TB`, `200MiB`
+
+    :param value`(str)`: 大小字符串
+    :return `int`: 字节数
+    """
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)(?:i?B)?\s*", value, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无效的大小: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+
+def _version_key(version: str | None) -> tuple[int, ...]:
+    return tuple(int(part) for part in (version or "").split(".") if part.isdigit())
+
+
+def plan_portable_retention(
+    file_sizes: dict[str, int],
+    policy: RetentionPolicy,
+    today: datetime.date | None = None,
+) -> RetentionPlan:
+    """根据保留规则生成整合包保留计划
+
+    - 每个 (软件名, 署名) 分组中按构建日期保留最新的 `keep_nightly` 个 nightly 整合包,
+      按版本号保留最新的 `keep_stable` 个 stable 整合包
+    - 构建日期超过 `max_age_days` 的 nightly 整合包删除
+    - 剩余整合包总大小超过 `byte_budget` 时, 先按构建日期从旧到新删除全部可删除的 nightly 整合包,
+      仍然超出时再从每组中较旧的版本开始删除 stable 整合包, 每组最新的 nightly 和 stable 整合包始终保留,
+      stable 整合包的文件名只有版本号而没有构建日期, 无法与 nightly 整合包按时间统一排序,
+      因此 nightly 整合包无论新旧都先于 stable 整合包删除
+
+    相同输入始终生成相同的计划
+
+    :param file_sizes`(dict[str, int])`: 仓库文件路径和文件大小
+    :param policy`(RetentionPolicy)`: 保留规则
+    :param today`(datetime.date | None)`: 计算整合包天数使用的日期, 默认为当天
+    :return `RetentionPlan`: 保留计划
+    """
+    today = today or datetime.date.today()
+    stable, nightly = fitter_portable_list(sorted(file_sizes))
+    groups: dict[tuple[str, str], list[tuple[str, PortableNameComponent]]] = {}
+    for file in stable + nightly:
+        portable = parse_portable_filename(os.path.basename(file))
+        groups.setdefault((portable.software, portable.signature), []).append((file, portable))
+
+    decisions: dict[str, RetentionDecision] = {}
+    # 超出大小上限时可删除的整合包 (排序键, 路径)
+    evictable: list[tuple[tuple[Any, ...], str]] = []
+    for (software, signature), items in sorted(groups.items()):
+        group = f"{software}-{signature}"
+        nightly_items = sorted(
+            (item for item in items if item[1].build_type == "nightly"),
+            key=lambda item: (item[1].build_date, item[0]),
+            reverse=True,
+        )
+        stable_items = sorted(
+            (item for item in items if item[1].build_type == "stable"),
+            key=lambda item: (_version_key(item[1].version), item[0]),
+            reverse=True,
+        )
+        for build_type, ordered, keep_count in (
+            ("nightly", nightly_items, policy["keep_nightly"]),
+            ("stable", stable_items, policy["keep_stable"]),
+        ):
+            for rank, (file, portable) in enumerate(ordered):
+                action: Literal["keep", "delete"] = "keep"
+                reason = "保留"
+                if keep_count is not None and rank >= keep_count:
+                    action, reason = "delete", f"超出保留的 {build_type} 数量 ({keep_count})"
+                elif build_type == "nightly" and policy["max_age_days"] is not None:
+                    build_date = datetime.datetime.strptime(portable.build_date, r"%Y%m%d").date()
+                    if (today - build_date).days >= policy["max_age_days"]:
+                        action, reason = "delete", f"超过 {policy['max_age_days']} 天"
+
+                decisions[file] = {
+                    "path": file,
+                    "group": group,
+                    "build_type": build_type,
+                    "size": file_sizes[file],
+                    "action": action,
+                    "reason": reason,
+                }
+                if action == "keep" and rank > 0:
+                    if build_type == "nightly":
+                        evictable.append(((0, portable.build_date, file), file))
+                    else:
+                        evictable.append(((1, -rank, file), file))
+
+    budget = policy["byte_budget"]
+    if budget is not None:
+        kept_bytes = sum(item["size"] for item in decisions.values() if item["action"] == "keep")
+        for _, file in sorted(evictable):
+            if kept_bytes <= budget:
+                break
+            decisions[file]["action"] = "delete"
+            decisions[file]["reason"] = f"超出大小上限 ({budget} 字节)"
+            kept_bytes -= decisions[file]["size"]
+
+    ordered_decisions = [decisions[file] for file in sorted(decisions)]
+    keep = [item for item in ordered_decisions if item["action"] == "keep"]
+    delete = [item for item in ordered_decisions if item["action"] == "delete"]
+    return {
+        "keep": keep,
+        "delete": delete,
+        "kept_bytes": sum(item["size"] for item in keep),
+        "reclaimed_bytes": sum(item["size"] for item in delete),
+    }
+
+
+def print_retention_plan(plan: RetentionPlan) -> None:
+    """打印整合包保留计划
+
+    :param plan`(RetentionPlan)`: 保留计划
+    """
+    print("整合包保留计划:")
+    for item in sorted(plan["keep"] + plan["delete"], key=lambda item: (item["group"], item["path"])):
+        print(f"- [{item['action']}] {item['path']} ({item['size']} 字节): {item['reason']}")
+    print(
+        f"保留: {len(plan['keep'])} 个 ({plan['kept_bytes']} 字节), "
+        f"删除: {len(plan['delete'])} 个 (释放 {plan['reclaimed_bytes']} 字节)"
+    )
+
+
+def get_existing_repo_paths(
+    api: HfApi,
+    repo_id: str,
+    repo_type: HFRepoType,
+    paths: list[str],
+    chunk_size: int = 200,
+) -> set[str]:
+    """查询 HuggingFace 仓库当前文件树中仍然存在的文件
 
-    :param name`(str)`: 整合包名称
-    :param day_threshold`(int)`: 整合包发布天数限制
-    :return `bool`: 当整合包发布时间超过限制时为过期整合包
+    :param api`(HfApi)`: HuggingFace Api 实例
+    :param repo_id`(str)`: HuggingFace 仓库 ID
+    :param repo_type`(HFRepoType)`: HuggingFace 仓库类型
+    :param paths`(list[str])`: 要查询的文件路径
+    :param chunk_size`(int)`: 每次查询的路径数量
+    :return `set[str]`: 仍然存在的文件路径
     """
-    portable = parse_portable_filename(name)
-    date = datetime.datetime.strptime(portable.build_date, r"%Y%m%d")
-    date_threshold = datetime.datetime.today() - datetime.timedelta(days=day_threshold)
-    return date < date_threshold
+    existing: set[str] = set()
+    for index in range(0, len(paths), chunk_size):
+        existing.update(
+            item.path
+            for item in api.get_paths_info(
+                repo_id=repo_id,
+                paths=paths[index:index + chunk_size],
+                repo_type=repo_type,
+            )
+            if isinstance(item, RepoFile)
+        )
+    return existing
 
 
-def get_outdated_portable(file_list: list[str], day_threshold: int = 60) -> list[str]:
-    """获取已经过期的整合包列表
+@retryable(
+    times=3,
+    delay=5.0,
+    describe="提交 HuggingFace 文件删除",
+    catch_exceptions=Exception,
+    raise_exception=RuntimeError,
+)
+def commit_hf_deletions(
+    api: HfApi,
+    repo_id: str,
+    repo_type: HFRepoType,
+    file_list: list[str],
+    commit_message: str,
+) -> tuple[list[str], str | None]:
+    """提交一批 HuggingFace 文件删除
 
-    :param file_list`(list[str])`: 整合包列表
-    :param `list[str]`: 过期的整合包列表
+    每次尝试前都会重新确认文件是否仍然存在, 上一次超时但实际已成功的提交不会被重复提交
+
+    :param api`(HfApi)`: HuggingFace Api 实例
+    :param repo_id`(str)`: HuggingFace 仓库 ID
+    :param repo_type`(HFRepoType)`: HuggingFace 仓库类型
+    :param file_list`(list[str])`: 要删除的文件列表
+    :param commit_message`(str)`: 提交信息
+    :return `tuple[list[str], str | None]`: 本次提交删除的文件和提交 ID, 文件均已不存在时提交 ID 为 None
     """
-    outdated_list = []
-    print(f"整合包数量: {len(file_list)}")
-    for file in file_list:
-        name = os.path.basename(file)
-        if is_outdated_portable(name, day_threshold):
-            outdated_list.append(file)
+    existing = get_existing_repo_paths(api, repo_id, repo_type, file_list)
+    pending = [file for file in file_list if file in existing]
+    if not pending:
+        return [], None
 
-    print(f"已过期的整合包数量: {len(outdated_list)}")
-    return outdated_list
+    commit_info = api.create_commit(
+        repo_id=repo_id,
+        repo_type=repo_type,
+        operations=[CommitOperationDelete(file) for file in pending],
+        commit_message=commit_message,
+    )
+    return pending, getattr(commit_info, "oid", None)
 
 
 def remove_files_from_hf_repo(
@@ -948,65 +1225,410 @@ def remove_files_from_hf_repo(
     repo_id: str,
     repo_type: HFRepoType,
     file_list: list[str],
-) -> None:
+    batch_size: int = 100,
+) -> bool:
     """从 HuggingFace 仓库中移除文件
 
+    删除操作按 `batch_size` 拆分为多个提交, 每个提交失败时自动重试,
+    中断后重新运行时根据仓库当前的文件树跳过已经删除的文件, 不依赖本地保存的进度记录
+
     :param api`(HfApi)`: HuggingFace Api 实例
     :param repo_id`(str)`: HuggingFace 仓库 ID
     :param repo_type`(HFRepoType)`: HuggingFace 仓库类型
     :param file_list`(list[str])`: 要从 HuggingFace 仓库移除的文件列表
+    :param batch_size`(int)`: 每个提交包含的文件数量
+    :return `bool`: 文件移除成功时返回`True`
     """
     if len(file_list) == 0:
         print("要删除的文件列表为空")
-        return
-    op = [
-        CommitOperationDelete(file)
-        for file in file_list
-    ]
+        return True
+
     try:
-        api.create_commit(
-            repo_id=repo_id,
-            repo_type=repo_type,
-            operations=op,
-            commit_message="Clean outdated sd portable",
-        )
-        print(
-            f"从 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 清理 {len(file_list)} 个过期整合包")
-    except (ValueError, ConnectionError, TypeError) as e:
+        existing = get_existing_repo_paths(api, repo_id, repo_type, file_list)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"查询 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 的文件树时发生错误: {e}")
+        return False
+
+    already_deleted = [file for file in file_list if file not in existing]
+    if already_deleted:
+        print(f"跳过 {len(already_deleted)} 个已不在仓库中的文件")
+    pending = [file for file in file_list if file in existing]
+
+    total_batches = (len(pending) + batch_size - 1) // batch_size
+    deleted_count = 0
+    for batch_index in range(total_batches):
+        batch = pending[batch_index * batch_size:(batch_index + 1) * batch_size]
+        message = "Clean outdated sd portable"
+        if total_batches > 1:
+            message = f"{message} (batch {batch_index + 1}/{total_batches})"
+        try:
+            deleted, oid = commit_hf_deletions(api, repo_id, repo_type, batch, message)
+        except RuntimeError as e:
+            print(
+                f"从 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 清理过期整合包时发生了错误 "
+                f"(批次 {batch_index + 1}/{total_batches}), 已删除 {deleted_count} 个文件: {e}"
+            )
+            return False
+
+        deleted_count += len(deleted)
         print(
-            f"从 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 清理过期整合包时发送了错误: {e}")
+            f"HuggingFace 删除提交 {batch_index + 1}/{total_batches} 完成, "
+            f"文件数量: {len(deleted)}, 提交 ID: {oid}"
+        )
 
+    print(
+        f"从 HuggingFace 仓库 {repo_id} (类型: {repo_type}) 清理 {deleted_count} 个过期整合包")
+    return True
 
-def remove_files_from_ms_repo(
+
+# ModelScope 文件删除方式
+# - api: 通过提交接口批量发送 delete 操作, 接口拒绝时回退到 git
+# - git: 克隆仓库后删除文件并推送
+MSDeleteBackend: TypeAlias = Literal["api", "git"]
+MS_DELETE_BACKENDS = ("api", "git")
+
+
+class ModelScopeCommitApiError(RuntimeError):
+    """ModelScope 提交接口拒绝请求时抛出的异常"""
+
+    def __init__(self, message: str, committed: int) -> None:
+        super().__init__(message)
+        self.committed = committed
+
+
+def remove_files_from_ms_repo_via_api(
+    api: HubApi,
     repo_id: str,
     repo_type: MSRepoType,
     file_list: list[str],
     token: str,
+    batch_size: int = 100,
+    revision: str = "master",
 ) -> None:
+    """通过 ModelScope 提交接口批量删除文件, 每 `batch_size` 个文件发送一次请求
+
+    :param api`(HubApi)`: ModelScope Api 实例
+    :param repo_id`(str)`: ModelScope 仓库 ID
+    :param repo_type`(MSRepoType)`: ModelScope 仓库类型
+    :param file_list`(list[str])`: 要从 ModelScope 仓库移除的文件列表
+    :param token`(str)`: ModelScope API Token
+    :param batch_size`(int)`: 每次提交包含的文件数量
+    :param revision`(str)`: 仓库分支
+    :raises ModelScopeCommitApiError: 提交接口拒绝请求时, `committed` 为已成功删除的文件数量
+    """
+    url = f"{api.endpoint}/api/v1/repos/{repo_type}s/{repo_id}/commit/{revision}"
+    total_batches = (len(file_list) + batch_size - 1) // batch_size
+    committed = 0
+    for batch_index in range(total_batches):
+        batch = file_list[batch_index * batch_size:(batch_index + 1) * batch_size]
+        message = "Clean outdated sd portable"
+        if total_batches > 1:
+            message = f"{message} (batch {batch_index + 1}/{total_batches})"
+        payload = {
+            "commit_message": message,
+            "actions": [{"action": "delete", "path": file} for file in batch],
+        }
+        try:
+            response = api.session.post(
+                url,
+                headers=api.builder_headers(api.headers),
+                data=json.dumps(payload),
+                cookies=api.get_cookies(access_token=token, cookies_required=True),
+                timeout=60,
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+            raise_on_error(response.json())
+        except Exception as e:
+            raise ModelScopeCommitApiError(
+                f"ModelScope 提交接口删除文件失败 (批次 {batch_index + 1}/{total_batches}): {e}",
+                committed=committed,
+            ) from e
+
+        committed += len(batch)
+        print(f"通过提交接口删除文件, 批次 {batch_index + 1}/{total_batches}, 文件数量: {len(batch)}")
+
+
+def remove_files_from_ms_repo(
+    repo_id: str,
+    repo_type: MSRepoType,
+    file_list: list[str],
+    token: str,
+    clone_mode: MSCloneMode = "full",
+    backend: MSDeleteBackend = "git",
+    api: HubApi | None = None,
+    batch_size: int = 100,
+) -> bool:
     """从 ModelScope 仓库中移除文件
 
     :param repo_id`(str)`: ModelScope 仓库 ID
     :param repo_type`(MSRepoType)`: ModelScope 仓库类型
     :param file_list`(list[str])`: 要从 ModelScope 仓库移除的文件列表
     :param token`(str)`: ModelScope API Token
+    :param clone_mode`(MSCloneMode)`: 使用 git 删除时的仓库克隆模式
+    :param backend`(MSDeleteBackend)`: 删除方式, 为 `api` 时接口拒绝请求后使用 git 删除剩余文件
+    :param api`(HubApi | None)`: 已登录的 ModelScope Api 实例, 使用 `api` 删除方式时需要
+    :param batch_size`(int)`: 使用 `api` 删除方式时每次提交包含的文件数量
+    :return `bool`: 文件移除成功时返回`True`
     """
     if len(file_list) == 0:
         print("要删除的文件列表为空")
-        return
+        return True
+
+    if backend == "api" and api is not None:
+        try:
+            remove_files_from_ms_repo_via_api(
+                api=api,
+                repo_id=repo_id,
+                repo_type=repo_type,
+                file_list=file_list,
+                token=token,
+                batch_size=batch_size,
+            )
+            print(
+                f"从 ModelScope 仓库 {repo_id} (类型: {repo_type}) 清理 {len(file_list)} 个过期整合包")
+            return True
+        except ModelScopeCommitApiError as e:
+            print(f"{e}, 回退到 git 删除剩余的 {len(file_list) - e.committed} 个文件")
+            file_list = file_list[e.committed:]
+
     try:
         with ModelScopeGitRepo(
             repo_id=repo_id,
             repo_type=repo_type,
             token=token,
+            clone_mode=clone_mode,
         ) as repo:
             for file in file_list:
                 repo.delete(file)
             repo.commit("Clean outdated sd portable")
         print(
             f"从 ModelScope 仓库 {repo_id} (类型: {repo_type}) 清理 {len(file_list)} 个过期整合包")
+        return True
     except (ValueError, ConnectionError, TypeError, RuntimeError, OSError) as e:
         print(
             f"从 ModelScope 仓库 {repo_id} (类型: {repo_type}) 清理过期整合包时发送了错误: {e}")
+        return False
+
+
+class CleanTarget(TypedDict):
+    platform: Literal["huggingface", "modelscope"]
+    repo_id: str
+    repo_type: RepoType
+
+
+class CleanResult(TypedDict):
+    platform: Literal["huggingface", "modelscope"]
+    repo_id: str
+    repo_type: RepoType
+    status: Literal["success", "failed", "dry_run"]
+    deleted: int
+    reclaimed_bytes: int
+    seconds: float
+    error: NotRequired[str]
+
+
+def parse_repo_list_env(
+    env_value: str | None,
+    platform: Literal["huggingface", "modelscope"],
+) -> list[CleanTarget]:
+    """从环境变量中解析仓库列表
+
+    :param env_value`(str | None)`: 环境变量值, 格式为 "repo_id:repo_type", 每行一个
+    :param platform`(str)`: 仓库所在平台
+    :return `list[CleanTarget]`: 仓库列表
+    """
+    targets: list[CleanTarget] = []
+    for line in (env_value or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        parts = line.split(":")
+        if len(parts) != 2:
+            print(f"警告: 跳过无效的仓库配置: {line}")
+            continue
+
+        repo_id, repo_type = parts[0].strip(), parts[1].strip()
+        if repo_type not in REPO_TYPES:
+            print(f"警告: 跳过无效的仓库类型 {repo_type} (仓库: {repo_id})")
+            continue
+
+        targets.append({
+            "platform": platform,
+            "repo_id": repo_id,
+            "repo_type": cast(RepoType, repo_type),
+        })
+
+    return targets
+
+
+def dedupe_clean_targets(targets: list[CleanTarget]) -> list[CleanTarget]:
+    """按平台, 仓库类型和仓库 ID 去除重复的仓库, 避免多个线程同时清理同一个仓库
+
+    :param targets`(list[CleanTarget])`: 要清理的仓库列表
+    :return `list[CleanTarget]`: 去重后的仓库列表, 保留每个仓库第一次出现的位置
+    """
+    seen: set[tuple[str, str, str]] = set()
+    unique_targets: list[CleanTarget] = []
+    for target in targets:
+        key = (target["platform"], target["repo_type"], target["repo_id"])
+        if key in seen:
+            print(f"警告: 跳过重复的仓库 {target['platform']}:{target['repo_id']} (类型: {target['repo_type']})")
+            continue
+        seen.add(key)
+        unique_targets.append(target)
+    return unique_targets
+
+
+def clean_portable_repo(
+    target: CleanTarget,
+    token: str,
+    policy: RetentionPolicy,
+    plan_path: str | None = None,
+    dry_run: bool = False,
+    ms_clone_mode: MSCloneMode = "full",
+    ms_delete_backend: MSDeleteBackend = "git",
+    ms_delete_batch_size: int = 100,
+    hf_delete_batch_size: int = 100,
+) -> CleanResult:
+    """清理单个仓库中的过期整合包, 错误不会向外抛出, 而是记录在返回结果中
+
+    :param target`(CleanTarget)`: 要清理的仓库
+    :param token`(str)`: 仓库所在平台的 Token
+    :param policy`(RetentionPolicy)`: 整合包保留规则
+    :param plan_path`(str | None)`: 保存保留计划 Json 文件的目录
+    :param dry_run`(bool)`: 只生成保留计划, 不删除文件
+    :param ms_clone_mode`(MSCloneMode)`: 使用 git 删除 ModelScope 文件时的仓库克隆模式
+    :param ms_delete_backend`(MSDeleteBackend)`: ModelScope 文件删除方式
+    :param ms_delete_batch_size`(int)`: 使用 `api` 删除方式时每次提交包含的文件数量
+    :param hf_delete_batch_size`(int)`: HuggingFace 每个删除提交包含的文件数量
+    :return `CleanResult`: 清理结果
+    """
+    platform = target["platform"]
+    repo_id = target["repo_id"]
+    repo_type = target["repo_type"]
+    platform_name = "HuggingFace" if platform == "huggingface" else "ModelScope"
+    result: CleanResult = {
+        "platform": platform,
+        "repo_id": repo_id,
+        "repo_type": repo_type,
+        "status": "success",
+        "deleted": 0,
+        "reclaimed_bytes": 0,
+        "seconds": 0.0,
+    }
+    start = time.perf_counter()
+    try:
+        print(f"清理 {platform_name} 仓库 {repo_id} 中的过期整合包")
+        if platform == "huggingface":
+            api: HfApi | HubApi = HfApi(token=token)
+        else:
+            api = HubApi()
+            api.login(access_token=token)
+
+        plan = plan_portable_retention(get_repo_file_sizes(api, repo_id, repo_type), policy)
+        print_retention_plan(plan)
+        if plan_path:
+            path = Path(plan_path) / f"{platform}_{repo_id.replace('/', '_')}_retention_plan.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(plan, ensure_ascii=False, indent=4), encoding="utf-8")
+            print(f"保留计划已保存到: {path}")
+
+        outdated_portable = [item["path"] for item in plan["delete"]]
+        if dry_run:
+            print(f"DRY_RUN 已启用, 不删除 {platform_name} 仓库 {repo_id} 中的文件")
+            result["status"] = "dry_run"
+        elif outdated_portable:
+            print(f"{platform_name} 仓库 {repo_id} 中的过期整合包")
+            for i in outdated_portable:
+                print(f"- {i}")
+            if platform == "huggingface":
+                success = remove_files_from_hf_repo(
+                    api=cast(HfApi, api),
+                    repo_id=repo_id,
+                    repo_type=repo_type,
+                    file_list=outdated_portable,
+                    batch_size=hf_delete_batch_size,
+                )
+            else:
+                success = remove_files_from_ms_repo(
+                    repo_id=repo_id,
+                    repo_type=repo_type,
+                    file_list=outdated_portable,
+                    token=token,
+                    clone_mode=ms_clone_mode,
+                    backend=ms_delete_backend,
+                    api=cast(HubApi, api),
+                    batch_size=ms_delete_batch_size,
+                )
+            if success:
+                result["deleted"] = len(outdated_portable)
+                result["reclaimed_bytes"] = plan["reclaimed_bytes"]
+            else:
+                result["status"] = "failed"
+                result["error"] = "删除文件失败"
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"清理 {platform_name} 仓库 {repo_id} 时发生错误: {e}")
+        result["status"] = "failed"
+        result["error"] = str(e)
+
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def clean_portable_repos(
+    targets: list[CleanTarget],
+    tokens: dict[str, str],
+    policy: RetentionPolicy,
+    max_workers: int = 4,
+    **kwargs: Any,
+) -> list[CleanResult]:
+    """并发清理多个仓库中的过期整合包, 各仓库的失败相互隔离, 重复的仓库只清理一次, 返回结果的顺序与去重后的输入顺序一致
+
+    :param targets`(list[CleanTarget])`: 要清理的仓库列表
+    :param tokens`(dict[str, str])`: 各平台的 Token `{<平台>: <Token>}`
+    :param policy`(RetentionPolicy)`: 整合包保留规则
+    :param max_workers`(int)`: 最大并发数
+    :param kwargs`(Any)`: 传递给 `clean_portable_repo` 的其他参数
+    :return `list[CleanResult]`: 各仓库的清理结果
+    """
+    targets = dedupe_clean_targets(targets)
+    if not targets:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(
+            executor.map(
+                lambda target: clean_portable_repo(
+                    target=target,
+                    token=tokens[target["platform"]],
+                    policy=policy,
+                    **kwargs,
+                ),
+                targets,
+            )
+        )
+
+
+def print_clean_results(results: list[CleanResult], seconds: float) -> None:
+    """打印各仓库的清理结果
+
+    :param results`(list[CleanResult])`: 各仓库的清理结果
+    :param seconds`(float)`: 总耗时
+    """
+    print("=" * 60)
+    print("清理结果:")
+    for result in results:
+        line = (
+            f"- [{result['status']}] {result['platform']}:{result['repo_id']} (类型: {result['repo_type']}), "
+            f"删除: {result['deleted']} 个, 释放: {result['reclaimed_bytes']} 字节, 耗时: {result['seconds']:.2f} 秒"
+        )
+        if "error" in result:
+            line += f", 错误: {result['error']}"
+        print(line)
+    print(f"总耗时: {seconds:.2f} 秒")
+    print("=" * 60)
 
 
 def main() -> None:
@@ -1018,48 +1640,60 @@ def main() -> None:
     ms_repo_id = os.getenv("MS_REPO_ID")
     ms_repo_type = get_env_repo_type("MS_REPO_TYPE")
     day_threshold = int(os.getenv("DAY_THRESHOLD", "60"))
+    ms_clone_mode = os.getenv("MS_CLONE_MODE", "full")
+    if ms_clone_mode not in MS_CLONE_MODES:
+        raise ValueError(f"MS_CLONE_MODE 必须是以下值之一: {', '.join(MS_CLONE_MODES)}")
+    ms_delete_backend = os.getenv("MS_DELETE_BACKEND", "git")
+    if ms_delete_backend not in MS_DELETE_BACKENDS:
+        raise ValueError(f"MS_DELETE_BACKEND 必须是以下值之一: {', '.join(MS_DELETE_BACKENDS)}")
+    ms_delete_batch_size = int(os.getenv("MS_DELETE_BATCH_SIZE", "100"))
+
+    policy: RetentionPolicy = {
+        "keep_nightly": int(os.environ["KEEP_NIGHTLY"]) if os.getenv("KEEP_NIGHTLY") else None,
+        "keep_stable": int(os.environ["KEEP_STABLE"]) if os.getenv("KEEP_STABLE") else None,
+        "max_age_days": day_threshold,
+        "byte_budget": parse_size(os.environ["SIZE_BUDGET"]) if os.getenv("SIZE_BUDGET") else None,
+    }
 
-    if hf_token and hf_repo_id:
-        print(f"清理 HuggingFace 仓库 {hf_repo_id} 中的过期整合包")
-        hf_api = HfApi(token=hf_token)
-        hf_repo_files = get_repo_file(hf_api, hf_repo_id, hf_repo_type)
-        _, hf_nightly_portable = fitter_portable_list(hf_repo_files)
-        hf_outdated_portable = get_outdated_portable(
-            file_list=hf_nightly_portable,
-            day_threshold=day_threshold
-        )
-        if len(hf_outdated_portable) != 0:
-            print(f"HuggingFace 仓库 {hf_repo_id} 中的过期整合包")
-            for i in hf_outdated_portable:
-                print(f"- {i}")
-            remove_files_from_hf_repo(
-                api=hf_api,
-                repo_id=hf_repo_id,
-                repo_type=hf_repo_type,
-                file_list=hf_outdated_portable
-            )
-
-    if ms_token and ms_repo_id:
-        print(f"清理 ModelScope 仓库 {ms_repo_id} 中的过期整合包")
-        ms_api = HubApi()
-        ms_api.login(access_token=ms_token)
-        ms_repo_files = get_repo_file(ms_api, ms_repo_id, ms_repo_type)
-        _, ms_nightly_portable = fitter_portable_list(ms_repo_files)
-        ms_outdated_portable = get_outdated_portable(
-            file_list=ms_nightly_portable,
-            day_threshold=day_threshold
-        )
-        if len(ms_outdated_portable) != 0:
-            print(f"ModelScope 仓库 {ms_repo_id} 中的过期整合包")
-            for i in ms_outdated_portable:
-                print(f"- {i}")
-            remove_files_from_ms_repo(
-                repo_id=ms_repo_id,
-                repo_type=ms_repo_type,
-                file_list=ms_outdated_portable,
-                token=ms_token,
-            )
-
+    targets: list[CleanTarget] = []
+    tokens: dict[str, str] = {}
+    for platform, token, repo_id, repo_type, list_env in (
+        ("huggingface", hf_token, hf_repo_id, hf_repo_type, "HF_REPO_LIST"),
+        ("modelscope", ms_token, ms_repo_id, ms_repo_type, "MS_REPO_LIST"),
+    ):
+        platform_targets = parse_repo_list_env(os.getenv(list_env), cast(Literal["huggingface", "modelscope"], platform))
+        if repo_id:
+            platform_targets.insert(0, {
+                "platform": cast(Literal["huggingface", "modelscope"], platform),
+                "repo_id": repo_id,
+                "repo_type": repo_type,
+            })
+        if platform_targets and not token:
+            print(f"未设置 {platform} 的 Token, 跳过 {len(platform_targets)} 个仓库")
+            continue
+        if token:
+            tokens[platform] = token
+        targets.extend(platform_targets)
+
+    start = time.perf_counter()
+    results = clean_portable_repos(
+        targets=targets,
+        tokens=tokens,
+        policy=policy,
+        max_workers=int(os.getenv("CLEAN_CONCURRENCY", "4")),
+        plan_path=os.getenv("RETENTION_PLAN_PATH"),
+        dry_run=os.getenv("DRY_RUN") in ("1", "true", "True"),
+        ms_clone_mode=cast(MSCloneMode, ms_clone_mode),
+        ms_delete_backend=cast(MSDeleteBackend, ms_delete_backend),
+        ms_delete_batch_size=ms_delete_batch_size,
+        hf_delete_batch_size=int(os.getenv("HF_DELETE_BATCH_SIZE", "100")),
+    )
+    print_clean_results(results, time.perf_counter() - start)
+    print_command_summary()
+    failed = [result for result in results if result["status"] == "failed"]
+    if failed:
+        print(f"{len(failed)} 个仓库清理失败")
+        sys.exit(1)
     print("清理过期整合包完成")
 
 
@@ -0,0 +1,155 @@
+"""GitHub Release 接口请求工具
+
+请求 GitHub API 时使用 ETag 缓存响应, 内容未变化时服务器返回 304, 不消耗 API 速率限制,
+缓存目录可通过 GITHUB_CACHE_PATH 环境变量指定, 设置了 GITHUB_TOKEN 环境变量时附带认证信息
+
+用法:
+```python
+from github_release import get_github_cache_dir, get_github_release_by_tag, list_github_releases, prune_github_cache
+
+cache_dir = get_github_cache_dir()
+release = get_github_release_by_tag("licyk/term-sd", "wheel", cache_dir)
+releases = list_github_releases("Dao-AILab/flash-attention", cache_dir)
+prune_github_cache(cache_dir)
+```
+"""
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Any
+
+import requests
+
+
+GITHUB_API_URL = "https://api.github.com"
+
+
+def get_github_api_headers() -> dict[str, str]:
+    """
+    获取 GitHub API 请求头, 设置了 GITHUB_TOKEN 环境变量时附带认证信息
+    """
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def github_api_get(
+    url: str,
+    cache_dir: Path,
+) -> tuple[Any, str | None]:
+    """
+    请求 GitHub API 并使用 ETag 缓存响应
+
+    缓存中存在 ETag 时发送 If-None-Match 请求头, 内容未变化时服务器返回 304,
+    此时直接使用缓存的响应内容, 不消耗 API 速率限制
+
+    返回: (响应内容, 下一页链接), 资源不存在时响应内容为 None
+    """
+    cache_file = cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+    cached: dict | None = None
+    if cache_file.is_file():
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = None
+
+    headers = get_github_api_headers()
+    if cached is not None and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    response = requests.get(url=url, headers=headers, timeout=30)
+    if response.status_code == 304 and cached is not None:
+        # 更新修改时间, 标记该缓存仍在使用, 避免被 prune_github_cache 清理
+        os.utime(cache_file)
+        return cached["body"], cached.get("next")
+    if response.status_code == 404:
+        return None, None
+    if response.status_code < 200 or response.status_code >= 300:
+        error_msg = f"请求 {url} 失败，状态码: {response.status_code}"
+        print(error_msg)
+        raise RuntimeError(error_msg)
+
+    body = response.json()
+    next_url = response.links.get("next", {}).get("url")
+    etag = response.headers.get("ETag")
+    if etag:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(
+            json.dumps({"url": url, "etag": etag, "next": next_url, "body": body}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    return body, next_url
+
+
+def list_github_releases(
+    repo: str,
+    cache_dir: Path,
+) -> list[dict]:
+    """
+    获取仓库的全部 Release, 按 Link 响应头逐页获取, 每页 100 个
+    """
+    releases: list[dict] = []
+    url: str | None = f"{GITHUB_API_URL}/repos/{repo}/releases?per_page=100"
+    while url is not None:
+        page, url = github_api_get(url, cache_dir)
+        releases.extend(page or [])
+
+    return releases
+
+
+def get_github_release_by_tag(
+    repo: str,
+    tag: str,
+    cache_dir: Path,
+) -> dict | None:
+    """
+    通过标签直接获取单个 Release, 标签不存在时返回 None
+    """
+    release, _ = github_api_get(f"{GITHUB_API_URL}/repos/{repo}/releases/tags/{tag}", cache_dir)
+    return release
+
+
+def get_github_cache_dir() -> Path:
+    """
+    获取 GitHub API 响应缓存目录, 可通过 GITHUB_CACHE_PATH 环境变量指定
+    """
+    return Path(
+        os.getenv("GITHUB_CACHE_PATH", Path.home() / ".cache" / "hub-action" / "github")
+    ).absolute()
+
+
+def prune_github_cache(
+    cache_dir: Path,
+    max_age_days: float = 30,
+) -> int:
+    """
+    删除超过 max_age_days 天未被使用的 GitHub API 响应缓存
+
+    缓存在写入或命中 304 时更新修改时间, 翻页后不再出现的页面和不再请求的 Release 会在过期后被删除
+
+    返回: 删除的缓存数量
+    """
+    if not cache_dir.is_dir():
+        return 0
+
+    expire_time = time.time() - max_age_days * 86400
+    removed = 0
+    for cache_file in cache_dir.glob("*.json"):
+        try:
+            if cache_file.stat().st_mtime < expire_time:
+                cache_file.unlink()
+                removed += 1
+        except OSError:
+            continue
+
+    if removed:
+        print(f"清理 {removed} 个过期的 GitHub API 响应缓存")
+    return removed
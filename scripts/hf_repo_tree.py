@@ -0,0 +1,122 @@
+"""HuggingFace 仓库文件树并行获取
+
+先获取仓库 (或指定目录) 的顶层文件树, 再为每个顶层目录并行调用递归的 `list_repo_tree`,
+各目录获取完成后立即合并输出, 用于加快文件数量很多的大型仓库的文件列表获取
+
+用法:
+```python
+from huggingface_hub import HfApi
+from hf_repo_tree import iter_repo_tree_parallel, list_repo_files_parallel
+
+for item in iter_repo_tree_parallel(HfApi(), "licyk/image_training_set", repo_type="dataset"):
+    ...
+
+files = list_repo_files_parallel(HfApi(), "licyk/image_training_set", repo_type="dataset")
+```
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from huggingface_hub import HfApi
+    from huggingface_hub.hf_api import RepoFile, RepoFolder
+
+
+def iter_repo_tree_parallel(
+    api: "HfApi",
+    repo_id: str,
+    repo_type: str | None = None,
+    revision: str | None = None,
+    path_in_repo: str | None = None,
+    max_workers: int = 8,
+    expand: bool = False,
+    token: str | None = None,
+) -> Iterator["RepoFile | RepoFolder"]:
+    """并行递归获取仓库文件树
+
+    输出内容与 `HfApi.list_repo_tree(recursive=True)` 相同, 但顺序按各目录完成的先后合并,
+    需要固定顺序时由调用方排序
+
+    :param api`(HfApi)`: HuggingFace Api 实例
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str | None)`: 仓库种类 (model/dataset/space)
+    :param revision`(str | None)`: 仓库分支或提交
+    :param path_in_repo`(str | None)`: 只获取该目录下的文件树, 为 None 时获取整个仓库
+    :param max_workers`(int)`: 并行获取目录的最大线程数, 小于等于 1 时退化为单次递归获取
+    :param expand`(bool)`: 是否获取文件的最后提交和安全扫描等扩展信息
+    :param token`(str | None)`: HuggingFace Token
+    :return `Iterator[RepoFile | RepoFolder]`: 文件和目录
+    """
+    from huggingface_hub.hf_api import RepoFolder
+
+    def _list_tree(path: str | None, recursive: bool) -> list["RepoFile | RepoFolder"]:
+        return list(
+            api.list_repo_tree(
+                repo_id=repo_id,
+                path_in_repo=path,
+                recursive=recursive,
+                expand=expand,
+                repo_type=repo_type,
+                revision=revision,
+                token=token,
+            )
+        )
+
+    if max_workers <= 1:
+        yield from _list_tree(path_in_repo, recursive=True)
+        return
+
+    folders: list[str] = []
+    for item in _list_tree(path_in_repo, recursive=False):
+        if isinstance(item, RepoFolder):
+            folders.append(item.path)
+        yield item
+
+    if not folders:
+        return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(folders))) as executor:
+        futures = {executor.submit(_list_tree, folder, True): folder for folder in folders}
+        for future in as_completed(futures):
+            yield from future.result()
+
+    print(
+        f"并行获取 {repo_id} 中 {len(folders)} 个目录的文件树完成, "
+        f"耗时: {time.perf_counter() - start:.2f} 秒"
+    )
+
+
+def list_repo_files_parallel(
+    api: "HfApi",
+    repo_id: str,
+    repo_type: str | None = None,
+    revision: str | None = None,
+    max_workers: int = 8,
+    token: str | None = None,
+) -> list[str]:
+    """并行获取仓库文件路径列表, 可替代 `HfApi.list_repo_files`
+
+    :param api`(HfApi)`: HuggingFace Api 实例
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str | None)`: 仓库种类 (model/dataset/space)
+    :param revision`(str | None)`: 仓库分支或提交
+    :param max_workers`(int)`: 并行获取目录的最大线程数
+    :param token`(str | None)`: HuggingFace Token
+    :return `list[str]`: 排序后的仓库文件路径列表
+    """
+    from huggingface_hub.hf_api import RepoFile
+
+    return sorted(
+        item.path
+        for item in iter_repo_tree_parallel(
+            api,
+            repo_id=repo_id,
+            repo_type=repo_type,
+            revision=revision,
+            max_workers=max_workers,
+            token=token,
+        )
+        if isinstance(item, RepoFile)
+    )
@@ -1,6 +1,11 @@
 import os
+import sys
 from huggingface_hub import HfApi
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hf_repo_tree import list_repo_files_parallel  # noqa: E402
+
 
 
 api = HfApi()
@@ -8,11 +13,14 @@ file_list = []
 repo_file_list = []
 repo_id = os.environ.get("repo_id", "licyk/image_training_set")
 repo_type = os.environ.get("repo_type", "dataset")
+max_workers = int(os.environ.get("max_workers", "8"))
 
 print(f"获取 {repo_id} (类型: {repo_type}) 的文件列表中")
-repo_files = api.list_repo_files(
+repo_files = list_repo_files_parallel(
+    api,
     repo_id=repo_id,
-    repo_type=repo_type
+    repo_type=repo_type,
+    max_workers=max_workers,
 )
 
 
@@ -0,0 +1,73 @@
+"""ModelScope 仓库文件列表获取
+
+ModelScope 的数据集文件列表接口分页返回, 单次请求只能获取一页, 按页获取直到返回的条目数不足一页,
+模型仓库的文件列表接口一次返回全部文件
+
+用法:
+```python
+from modelscope import HubApi
+from ms_repo_tree import list_modelscope_dataset_files, list_modelscope_repo_tree
+
+files = list_modelscope_repo_tree("licyks/wheels", "model")
+files = list_modelscope_dataset_files(HubApi(), "licyks/sd-portable", revision="master")
+```
+"""
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from modelscope import HubApi
+
+
+def list_modelscope_dataset_files(
+    api: "HubApi",
+    repo_id: str,
+    page_size: int = 200,
+    **kwargs: Any,
+) -> list[dict[str, Any]]:
+    """按页获取 ModelScope 数据集仓库的全部文件
+
+    :param api`(HubApi)`: ModelScope Api 实例
+    :param repo_id`(str)`: 数据集仓库 ID
+    :param page_size`(int)`: 每页获取的条目数量
+    :param kwargs`(Any)`: 传递给 `HubApi.get_dataset_files` 的其他参数, 如 `revision`, `endpoint`, `token`
+    :return `list[dict[str, Any]]`: ModelScope Api 返回的文件列表
+    """
+    repo_files: list[dict[str, Any]] = []
+    page_number = 1
+    while True:
+        page = api.get_dataset_files(
+            repo_id=repo_id,
+            recursive=True,
+            page_number=page_number,
+            page_size=page_size,
+            **kwargs,
+        )
+        repo_files.extend(page)
+        if len(page) < page_size:
+            break
+        page_number += 1
+    return repo_files
+
+
+def list_modelscope_repo_tree(
+    repo_id: str,
+    repo_type: str,
+    api: "HubApi | None" = None,
+) -> list[dict[str, Any]]:
+    """获取 ModelScope 仓库文件树, 数据集仓库按页获取
+
+    :param repo_id`(str)`: 仓库 ID
+    :param repo_type`(str)`: 仓库种类 (model/dataset/space)
+    :param api`(HubApi | None)`: ModelScope Api 实例, 为 None 时创建新的实例
+    :return `list[dict[str, Any]]`: ModelScope Api 返回的文件列表
+    """
+    if api is None:
+        from modelscope import HubApi
+
+        api = HubApi()
+    if repo_type == "model":
+        return api.get_model_files(model_id=repo_id, recursive=True)
+    if repo_type == "dataset":
+        return list_modelscope_dataset_files(api, repo_id)
+
+    raise ValueError(f"{repo_id} 仓库类型为 {repo_type}, 不支持获取文件列表")
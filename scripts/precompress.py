@@ -0,0 +1,152 @@
+"""生成文件的 .gz / .br 预压缩
+
+以最高压缩等级为静态页面托管的生成文件创建 .gz 和 .br 兄弟文件, 未安装 brotli 时只生成 .gz 文件,
+压缩时 gzip 的 mtime 固定为 0, 相同内容总是生成相同的压缩文件
+
+用法:
+```python
+from pathlib import Path
+from precompress import precompress_directory, precompress_files
+
+# 按哈希清单增量压缩目录中的生成文件, 并删除源文件已不存在的预压缩文件
+precompress_directory(Path("artifact/pypi"), (".html", ".json"))
+
+# 直接压缩指定文件
+precompress_files([Path("artifact/lora_list.json")])
+```
+"""
+import gzip
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+PRECOMPRESS_MANIFEST = ".precompress.json"
+
+
+def is_brotli_available() -> bool:
+    """检查是否安装了 brotli
+
+    :return `bool`: 已安装 brotli 时返回`True`
+    """
+    try:
+        import brotli  # pylint: disable=unused-import  # noqa: F401
+
+        return True
+    except ImportError:
+        print("未安装 brotli, 只生成 .gz 预压缩文件")
+        return False
+
+
+def compress_file(
+    path: Path,
+    use_brotli: bool,
+) -> None:
+    """以最高压缩等级生成 .gz 和 .br 预压缩文件
+
+    :param path`(Path)`: 要压缩的文件路径
+    :param use_brotli`(bool)`: 是否生成 .br 文件
+    """
+    data = path.read_bytes()
+    # mtime 固定为 0, 保证相同内容生成相同的压缩文件
+    Path(f"{path}.gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if use_brotli:
+        import brotli
+
+        Path(f"{path}.br").write_bytes(brotli.compress(data, quality=11))
+
+
+def precompress_files(
+    paths: list[Path],
+    max_workers: int = 8,
+) -> int:
+    """并行为指定文件创建 .gz 和 .br 预压缩文件, 不使用哈希清单
+
+    :param paths`(list[Path])`: 要压缩的文件路径, 不存在的文件将被跳过
+    :param max_workers`(int)`: 最大并发数
+    :return `int`: 压缩的文件数量
+    """
+    use_brotli = is_brotli_available()
+    pending = [path for path in paths if path.is_file()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda p: compress_file(p, use_brotli), pending))
+
+    print(f"预压缩完成, 压缩: {len(pending)}")
+    return len(pending)
+
+
+def precompress_directory(
+    root_dir: Path,
+    suffixes: tuple[str, ...],
+    max_workers: int = 8,
+    include: tuple[str, ...] | None = None,
+    manifest_name: str = PRECOMPRESS_MANIFEST,
+) -> dict[str, int]:
+    """为目录中的生成文件并行创建 .gz 和 .br 预压缩文件
+
+    通过目录中的哈希清单跳过内容未变化的文件, 并删除源文件已不存在的预压缩文件,
+    哈希清单需要随生成文件一起发布, 下一次构建时在原有的输出目录上运行才能生效
+
+    :param root_dir`(Path)`: 输出目录路径
+    :param suffixes`(tuple[str, ...])`: 需要预压缩的文件后缀
+    :param max_workers`(int)`: 最大并发数
+    :param include`(tuple[str, ...] | None)`: 只处理这些相对于 `root_dir` 的文件或目录, 为 None 时处理整个目录
+    :param manifest_name`(str)`: 哈希清单文件名, 多个脚本输出到同一目录时使用不同的文件名
+    :return `dict[str, int]`: 预压缩统计 `{"compressed": int, "unchanged": int, "removed": int}`
+    """
+    use_brotli = is_brotli_available()
+    manifest_file = root_dir / manifest_name
+    try:
+        old_manifest: dict[str, str] = json.loads(manifest_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old_manifest = {}
+
+    candidates: list[Path] = []
+    for relative_root in include if include is not None else ("",):
+        target = root_dir / relative_root
+        if target.is_file():
+            candidates.append(target)
+        elif target.is_dir():
+            candidates.extend(target.rglob("*"))
+
+    new_manifest: dict[str, str] = {}
+    pending: list[Path] = []
+    for path in sorted(set(candidates)):
+        if not path.is_file() or path.name.startswith(".") or not path.name.endswith(suffixes):
+            continue
+        relative_path = path.relative_to(root_dir).as_posix()
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        new_manifest[relative_path] = digest
+        outputs_exist = Path(f"{path}.gz").is_file() and (not use_brotli or Path(f"{path}.br").is_file())
+        if old_manifest.get(relative_path) != digest or not outputs_exist:
+            pending.append(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda p: compress_file(p, use_brotli), pending))
+
+    removed = 0
+    for relative_path in set(old_manifest) - set(new_manifest):
+        for suffix in (".gz", ".br"):
+            compressed_file = root_dir / f"{relative_path}{suffix}"
+            if compressed_file.is_file():
+                compressed_file.unlink()
+        removed += 1
+
+        # 源文件所在目录为空时一并删除
+        parent_dir = (root_dir / relative_path).parent
+        if parent_dir != root_dir and parent_dir.is_dir() and not any(parent_dir.iterdir()):
+            parent_dir.rmdir()
+
+    root_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file.write_text(json.dumps(dict(sorted(new_manifest.items())), indent=2), encoding="utf-8")
+    stats = {
+        "compressed": len(pending),
+        "unchanged": len(new_manifest) - len(pending),
+        "removed": removed,
+    }
+    print(
+        f"预压缩完成, 目录: {root_dir}, 压缩: {stats['compressed']}, "
+        f"未变化: {stats['unchanged']}, 删除: {stats['removed']}"
+    )
+    return stats
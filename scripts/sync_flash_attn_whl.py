@@ -1,4 +1,5 @@
 import os
+import sys
 import shutil
 import requests
 from enum import Enum
@@ -9,6 +10,14 @@ from pathlib import Path
 from sd_webui_all_in_one.retry_decorator import retryable
 from sd_webui_all_in_one.repo_manager import RepoManager
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from github_release import (  # noqa: E402
+    get_github_cache_dir,
+    list_github_releases,
+    prune_github_cache,
+)
+
 
 RepoType: TypeAlias = Literal["model", "dataset", "space"]
 
@@ -25,22 +34,11 @@ class ListType(int, Enum):
     catch_exceptions=(requests.RequestException, ValueError),
     raise_exception=RuntimeError,
 )
-def get_github_release_file(repo: str) -> list:
-    url = f"https://api.github.com/repos/{repo}/releases"
-    data = {
-        "Accept": "application/vnd.github+json",
-    }
+def get_github_release_file(repo: str, cache_dir: Path | None = None) -> list:
     file_list = []
 
     print(f"获取 {repo} 的文件列表")
-    response = requests.get(url=url, data=data, timeout=30)
-    res = response.json()
-    if response.status_code < 200 or response.status_code > 300:
-        error_msg = f"获取 {repo} 的文件列表失败，状态码: {response.status_code}"
-        print(error_msg)
-        raise RuntimeError(error_msg)
-
-    for i in res:
+    for i in list_github_releases(repo, cache_dir or get_github_cache_dir()):
         for x in i.get("assets"):
             file_list.append([x.get("name"), x.get("browser_download_url")])
 
@@ -289,6 +287,7 @@ def main() -> None:
         ms_repo_id="licyks/wheels",
         ms_repo_type="model",
     )
+    prune_github_cache(get_github_cache_dir())
 
 
 if __name__ == "__main__":
@@ -25,6 +25,10 @@ if LOCAL_HF_HUB_SRC.exists():
 from huggingface_hub import CommitOperationCopy, HfApi  # noqa: E402
 from huggingface_hub.hf_api import RepoFile  # noqa: E402
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from hf_repo_tree import iter_repo_tree_parallel  # noqa: E402
+
 
 SUPPORTED_REPO_TYPES = ("model", "dataset", "space")
 
@@ -77,6 +81,7 @@ def _iter_source_files(
     revision: Optional[str],
     source_path: str,
     token: Optional[str],
+    list_workers: int = 8,
 ) -> list[RepoFile]:
     source_path = source_path.strip("/")
 
@@ -91,18 +96,21 @@ def _iter_source_files(
         if len(path_info) == 1 and isinstance(path_info[0], RepoFile):
             return [path_info[0]]
 
-    return [
+    # Top-level directories are listed concurrently, so sort to keep commit batches stable.
+    files = [
         item
-        for item in api.list_repo_tree(
+        for item in iter_repo_tree_parallel(
+            api,
             repo_id=repo_id,
             path_in_repo=source_path or None,
-            recursive=True,
             repo_type=_repo_type_arg(repo_type),
             revision=revision,
+            max_workers=list_workers,
             token=token,
         )
         if isinstance(item, RepoFile)
     ]
+    return sorted(files, key=lambda item: item.path)
 
 
 def _collect_candidates(
@@ -168,14 +176,16 @@ def _filter_existing_targets(
     target_type: str,
     target_revision: Optional[str],
     token: Optional[str],
+    list_workers: int = 8,
 ) -> list[CopyCandidate]:
     existing = {
         item.path
-        for item in api.list_repo_tree(
+        for item in iter_repo_tree_parallel(
+            api,
             repo_id=target_repo,
-            recursive=True,
             repo_type=_repo_type_arg(target_type),
             revision=target_revision,
+            max_workers=list_workers,
             token=token,
         )
         if isinstance(item, RepoFile)
@@ -372,6 +382,12 @@ def parse_args() -> argparse.Namespace:
         help="Commit message for target repo. Defaults to 'Copy files from <source>'.",
     )
     parser.add_argument("--batch-size", type=int, default=256, help="Number of files per commit.")
+    parser.add_argument(
+        "--list-workers",
+        type=int,
+        default=8,
+        help="Threads used to list top-level directories concurrently. 1 disables parallel listing.",
+    )
     parser.add_argument(
         "--create-pr",
         action="store_true",
@@ -429,6 +445,7 @@ def main() -> int:
         revision=args.source_revision,
         source_path=args.source_path,
         token=args.token,
+        list_workers=args.list_workers,
     )
     print(f"Source files         : {len(source_files)}")
 
@@ -449,6 +466,7 @@ def main() -> int:
             target_type=target_type,
             target_revision=args.target_revision,
             token=args.token,
+            list_workers=args.list_workers,
         )
 
     if not candidates:
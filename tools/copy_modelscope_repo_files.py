@@ -37,6 +37,10 @@ from modelscope.utils.constant import (  # noqa: E402
 )
 from modelscope.utils.repo_utils import DATASET_LFS_SUFFIX, MODEL_LFS_SUFFIX  # noqa: E402
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+
+from ms_repo_tree import list_modelscope_dataset_files  # noqa: E402
+
 
 SUPPORTED_REPO_TYPES = (REPO_TYPE_MODEL, REPO_TYPE_DATASET)
 
@@ -112,25 +116,14 @@ def list_repo_files(api: HubApi, repo_id: str, repo_type: str, revision: str,
         )
 
     if repo_type == REPO_TYPE_DATASET:
-        files = []
-        page_number = 1
-        page_size = 200
-        while True:
-            page = api.get_dataset_files(
-                repo_id=repo_id,
-                revision=revision,
-                root_path='/',
-                recursive=True,
-                page_number=page_number,
-                page_size=page_size,
-                endpoint=endpoint,
-                token=token,
-            )
-            files.extend(page)
-            if len(page) < page_size:
-                break
-            page_number += 1
-        return files
+        return list_modelscope_dataset_files(
+            api,
+            repo_id,
+            revision=revision,
+            root_path='/',
+            endpoint=endpoint,
+            token=token,
+        )
 
     raise ValueError(f'Unsupported repo type: {repo_type}')
 